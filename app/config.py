@@ -1,3 +1,4 @@
+import os
 import torch
 from concurrent.futures import ThreadPoolExecutor
 
@@ -12,10 +13,67 @@ def get_device():
 MODEL_NAME = "stabilityai/stable-diffusion-2-1"
 DEVICE = get_device()
 
+# Pipeline backend: "diffusers" (the real models) or "stub" (no weights: synthetic images and simulated step latency)
+PIPELINE_BACKEND = os.getenv("PIPELINE_BACKEND", "diffusers")
+STUB_STEP_MS = float(os.getenv("STUB_STEP_MS", 50))  # Simulated time per step of one 512x512 sample
+
+# Models selectable per request through GenerateRequest.model, as "name=repository,name=repository"
+MODELS = dict(
+    entry.strip().split("=", 1)
+    for entry in os.getenv("MODELS", f"sd21={MODEL_NAME},sd-turbo=stabilityai/sd-turbo").split(",")
+)
+DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", next(iter(MODELS)))  # Used when a request names no model
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", 10240))  # Resident models beyond this are evicted least recently used first, 0 disables
+
 IMAGE_SIZE = 512  # Default image size
-MAX_CONCURRENT_JOBS = 4  # Maximum simultaneous generations
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", 4))  # Maximum simultaneous generations
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", 4))  # Compatible requests merged into one pipeline call
+BATCH_WINDOW_MS = int(os.getenv("BATCH_WINDOW_MS", 50))  # How long a worker waits for batch mates
 DEFAULT_STEPS = 50  # Default inference steps
 DEFAULT_GUIDANCE = 7.5  
+DEFAULT_IMAGE_QUALITY = 90  # WebP/JPEG quality when the request does not set one
+MAX_OUTPUT_SIZE = 1024  # Generated images are downscaled to fit this box before encoding
+
+# Retention of finished tasks in memory
+TASK_RETENTION_MAX = int(os.getenv("TASK_RETENTION_MAX", 5000))  # Finished tasks kept at most
+TASK_RETENTION_SECONDS = int(os.getenv("TASK_RETENTION_SECONDS", 6 * 3600))  # Finished tasks removed after this age
+TASK_RESULT_RETENTION_MAX = int(os.getenv("TASK_RESULT_RETENTION_MAX", 100))  # Finished tasks keeping their inline image
+TASK_RESULT_RETENTION_SECONDS = int(os.getenv("TASK_RESULT_RETENTION_SECONDS", 300))  # Inline images dropped after this age
+
+# Task state shared between API processes: "memory" (single process) or "sqlite" (any number of uvicorn workers on one host)
+TASK_STORE = os.getenv("TASK_STORE", "memory")
+TASK_STORE_PATH = os.getenv("TASK_STORE_PATH", "data/task_state.db")
+TASK_STORE_POLL_MS = int(os.getenv("TASK_STORE_POLL_MS", 100))  # How often a worker picks up changes made by the others
+
+# Task rows in the database
+TASK_PROGRESS_PERSIST_SECONDS = float(os.getenv("TASK_PROGRESS_PERSIST_SECONDS", 2))  # Progress is written at most this often per task
+TASK_RESTORE_POLICY = os.getenv("TASK_RESTORE_POLICY", "requeue")  # Tasks interrupted by a restart: "requeue" or "fail"
+
+# Cache of encoded images for seeded (deterministic) requests
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "true").lower() == "true"
+RESULT_CACHE_MEMORY_ITEMS = int(os.getenv("RESULT_CACHE_MEMORY_ITEMS", 64))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", ".cache/results")
+RESULT_CACHE_DISK_MB = int(os.getenv("RESULT_CACHE_DISK_MB", 1024))
+
+# Where generated image bytes live: "local" (content-addressed directory) or "database" (VARBINARY column)
+IMAGE_STORE = os.getenv("IMAGE_STORE", "local")
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", "data/images")
+THUMBNAIL_SIZE = 256  # Longest side of gallery thumbnails
+THUMBNAIL_FORMAT = "webp"
+THUMBNAIL_QUALITY = 75
+IMAGE_COUNT_TTL_SECONDS = 30  # How long /images serves a cached total before recounting
+
+# Write-behind database writer
+DB_WRITE_BATCH_SIZE = int(os.getenv("DB_WRITE_BATCH_SIZE", 100))  # Writes committed in one transaction at most
+DB_WRITE_INTERVAL_MS = int(os.getenv("DB_WRITE_INTERVAL_MS", 50))  # How long the writer gathers writes into a batch
+DB_WRITE_QUEUE_MAX = int(os.getenv("DB_WRITE_QUEUE_MAX", 10000))  # Writes beyond this are dropped; /generate answers 503 from 90% full
+DB_WRITE_BLOCK_MS = int(os.getenv("DB_WRITE_BLOCK_MS", 250))  # How long a task-row insert waits for room in a full queue before /generate answers 503
+
+SSE_KEEPALIVE_SECONDS = 15  # Comment line sent on idle progress streams to keep proxies from closing them
+WS_BATCH_INTERVAL_MS = 100  # Updates for many tasks on one socket are grouped over this window
+WS_MAX_SUBSCRIPTIONS = 100  # Tasks a single socket may watch at once
+PREVIEW_SIZE = 128  # Longest side of live latent previews
+PREVIEW_QUALITY = 70
 
 MODEL_CONFIG = {
     "torch_dtype": torch.float16 if DEVICE in ["cuda", "mps"] else torch.float32,
@@ -28,4 +86,30 @@ MODEL_CONFIG = {
 LOG_LEVEL = "INFO"
 LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-EXECUTOR = ThreadPoolExecutor(max_workers=4) 
\ No newline at end of file
+# Where the pipeline runs: "thread" (inside the API process) or "process" (separate model worker processes)
+MODEL_WORKER_MODE = os.getenv("MODEL_WORKER_MODE", "thread")
+MODEL_WORKERS = int(os.getenv("MODEL_WORKERS", 1))  # Model worker processes, each holding its own pipeline
+
+# CPU performance profile, applied when DEVICE is "cpu"
+CPU_BF16 = os.getenv("CPU_BF16", "auto").lower()  # bfloat16 autocast: "auto" (when the CPU has native bf16), "true" or "false"
+CPU_CHANNELS_LAST = os.getenv("CPU_CHANNELS_LAST", "true").lower() == "true"  # channels_last memory format for the UNet and VAE
+CPU_TORCH_COMPILE = os.getenv("CPU_TORCH_COMPILE", "false").lower() == "true"  # torch.compile the UNet, the first job pays the compile time
+CPU_THREADS_PER_JOB = int(os.getenv("CPU_THREADS_PER_JOB", 0))  # torch intra-op threads per job, 0 divides the cores between concurrent jobs
+
+# Admission control: estimated peak memory of the batches running at once (besides the model weights)
+# The default fits one request at the largest width and height GenerateRequest allows, fp32 on CPU (about 8.6GB)
+GENERATION_MEMORY_BUDGET_MB = int(os.getenv("GENERATION_MEMORY_BUDGET_MB", 9216))  # 0 disables
+
+PROMPT_EMBEDDING_CACHE_SIZE = int(os.getenv("PROMPT_EMBEDDING_CACHE_SIZE", 256))  # Text encoder outputs kept per process, 0 disables
+
+# Model startup and lifetime
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR")  # Hugging Face cache for the safetensors weights, default cache when unset
+MODEL_IDLE_UNLOAD_SECONDS = int(os.getenv("MODEL_IDLE_UNLOAD_SECONDS", 1800))  # Free the model after this long without jobs, 0 keeps it loaded
+MODEL_LOAD_RETRY_SECONDS = int(os.getenv("MODEL_LOAD_RETRY_SECONDS", 30))  # Wait before retrying a failed load, doubled per failure up to 10 minutes; 0 never retries
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "false").lower() == "true"  # Run a tiny inference right after loading
+MODEL_WARMUP_STEPS = 2
+MODEL_QUEUE_WHILE_LOADING = os.getenv("MODEL_QUEUE_WHILE_LOADING", "true").lower() == "true"  # Otherwise /generate answers 503 until ready
+
+# Dedicated to the generation queue workers, one thread per concurrent job: MAX_CONCURRENT_JOBS in thread mode,
+# one per model worker process in process mode
+EXECUTOR = ThreadPoolExecutor(max_workers=max(MAX_CONCURRENT_JOBS, MODEL_WORKERS), thread_name_prefix="generation") 
\ No newline at end of file
@@ -1,6 +1,8 @@
 from .task_manager import TaskManager
+from .task_events import TaskEventBus
 from .scheduler import TaskScheduler
-from .model_loader import ModelLoader, load_model, ModelLoader, model_loader, cleanup_models
+from .generation_queue import GenerationQueue
+from .model_loader import ModelLoader, ModelRegistry, load_model, model_registry, cleanup_models
 from .shutdown_manager import shutdown_manager
 
-__all__ = ['shutdown_manager','TaskManager','TaskScheduler', 'ModelLoader', 'load_model', 'model_loader','cleanup_models']
\ No newline at end of file
+__all__ = ['shutdown_manager','TaskManager', 'TaskEventBus','TaskScheduler', 'GenerationQueue', 'ModelLoader', 'ModelRegistry', 'load_model', 'model_registry','cleanup_models']
\ No newline at end of file
@@ -0,0 +1,159 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.config import DB_WRITE_BATCH_SIZE, DB_WRITE_INTERVAL_MS, DB_WRITE_QUEUE_MAX
+from app.utils.database import get_session
+
+Write = Callable[[Session], Any]
+OnCommit = Optional[Callable[[Any], None]]
+BACKLOG_SHARE = 0.9  # /generate stops accepting work at this share of the queue, leaving room for running tasks
+
+class WriterBacklogged(Exception):
+    """A write that later writes depend on could not be queued."""
+
+class DatabaseWriter:
+    """Write-behind persistence stage running on its own thread.
+
+    Request handlers and generation workers hand writes over with `submit` and
+    return immediately. The writer drains whatever has queued up (waiting at most
+    `interval_ms` for more after the first write) and commits it as one transaction.
+    If the batch fails, its writes are retried one by one so a single bad row does
+    not take the others down with it.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = DB_WRITE_BATCH_SIZE,
+        interval_ms: int = DB_WRITE_INTERVAL_MS,
+        max_queued: int = DB_WRITE_QUEUE_MAX,
+        session_factory: Optional[Callable[[], Session]] = None
+    ):
+        self.batch_size = max(1, batch_size)
+        self.max_queued = max_queued
+        self.interval = interval_ms / 1000
+        self.session_factory = session_factory or get_session
+        self._queue: "queue.Queue[Optional[Tuple[Write, OnCommit]]]" = queue.Queue(maxsize=max_queued)
+        self._thread: Optional[threading.Thread] = None
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        print("✅ Database writer started")
+
+    def stop(self, timeout: Optional[float] = 10.0) -> None:
+        """Flush everything queued so far, then stop the thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        print(f"🛑 Database writer stopped ({self.writes} writes in {self.batches} batches, {self.failures} failed)")
+
+    def submit(self, write: Write, on_commit: OnCommit = None, block_seconds: float = 0.0) -> bool:
+        """Queue `write(session)`; `on_commit(return value)` runs on the writer thread after commit.
+
+        Does not block by default: callers include the event loop. When the queue
+        is full the write waits up to `block_seconds` for room, then is dropped and
+        counted; the return value tells whether it was queued. Without a running
+        writer thread the write is executed inline.
+        """
+        if self._thread is None:
+            self._execute([(write, on_commit)])
+            return True
+        try:
+            if block_seconds > 0:
+                self._queue.put((write, on_commit), timeout=block_seconds)
+            else:
+                self._queue.put_nowait((write, on_commit))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            print(f"⚠️  Database writer queue full ({self.max_queued} writes), dropping a write")
+            return False
+
+    @property
+    def pending_count(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def backlogged(self) -> bool:
+        """Whether the writer has fallen so far behind that new work should be refused"""
+        return self.max_queued > 0 and self.pending_count >= self.max_queued * BACKLOG_SHARE
+
+    def _next_batch(self) -> Tuple[List[Tuple[Write, OnCommit]], bool]:
+        """Block for the first write, then gather more for up to `interval`; also report a stop request."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+
+        batch = [first]
+        deadline = time.monotonic() + self.interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            batch, stopping = self._next_batch()
+            if batch:
+                self._execute(batch)
+            if stopping:
+                # drain writes queued behind the stop marker
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        return
+                    if item is not None:
+                        self._execute([item])
+
+    def _execute(self, batch: List[Tuple[Write, OnCommit]]) -> None:
+        session = self.session_factory()
+        try:
+            try:
+                results = []
+                for write, _ in batch:
+                    results.append(write(session))
+                    # sessions do not autoflush: later writes (bulk updates) must see the rows added before them
+                    session.flush()
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                if len(batch) == 1:
+                    self.failures += 1
+                    print(f"❌ Database write failed: {e}")
+                    return
+                print(f"⚠️  Database batch of {len(batch)} failed ({e}), retrying writes one by one")
+                session.close()
+                for item in batch:
+                    self._execute([item])
+                return
+
+            self.batches += 1
+            self.writes += len(batch)
+            for (_, on_commit), result in zip(batch, results):
+                if on_commit is None:
+                    continue
+                try:
+                    on_commit(result)
+                except Exception as e:
+                    print(f"⚠️  Database write callback failed: {e}")
+        finally:
+            session.close()
+
+db_writer = DatabaseWriter()
@@ -0,0 +1,245 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import BATCH_WINDOW_MS, MAX_BATCH_SIZE, MAX_CONCURRENT_JOBS
+
+Job = Tuple[str, Any]
+
+class GenerationQueue:
+    """Bounded worker pool fed by a priority queue of generation jobs.
+
+    Each worker occupies one executor thread for the lifetime of the queue, so at
+    most `max_workers` batches run at once. Jobs with a higher priority are served
+    first, equal priorities are served in submission order. When `batch_key` is
+    given, a worker waits up to `batch_window_ms` after taking a job and merges
+    waiting jobs with the same key into one batch of at most `max_batch_size`.
+
+    When `job_memory` is given, batches are admitted against `memory_budget_bytes`:
+    a batch only grows while it fits, and a worker holds its batch back until the
+    batches already running leave room for it. A lone batch always runs, so jobs
+    larger than the whole budget must be rejected before they are submitted.
+    """
+
+    def __init__(
+        self,
+        executor: ThreadPoolExecutor,
+        max_workers: int = MAX_CONCURRENT_JOBS,
+        batch_key: Optional[Callable[[Any], Any]] = None,
+        max_batch_size: int = MAX_BATCH_SIZE,
+        batch_window_ms: int = BATCH_WINDOW_MS,
+        job_memory: Optional[Callable[[Any], int]] = None,
+        memory_budget_bytes: int = 0
+    ):
+        self.executor = executor
+        self.max_workers = max_workers
+        self.batch_key = batch_key
+        self.max_batch_size = max(1, max_batch_size)
+        self.batch_window = batch_window_ms / 1000
+        self.job_memory = job_memory
+        self.memory_budget_bytes = memory_budget_bytes if job_memory is not None else 0
+        self._reserved_bytes = 0
+        self._heap: List[list] = []
+        self._entries: Dict[str, list] = {}
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running: Dict[str, float] = {}
+        self._avg_job_seconds: Optional[float] = None
+        self._handler: Optional[Callable[[List[Job]], bool]] = None
+        self._stopped = False
+
+    def start(self, handler: Callable[[List[Job]], bool]) -> None:
+        """Start the workers. `handler([(task_id, payload), ...])` returns True when the batch ran to completion."""
+        self._handler = handler
+        self._stopped = False
+        for worker_id in range(self.max_workers):
+            self.executor.submit(self._worker_loop, worker_id)
+        print(f"✅ Generation queue started with {self.max_workers} workers")
+
+    def stop(self) -> None:
+        """Stop handing out jobs; running jobs are left to finish."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        print("🛑 Generation queue stopped")
+
+    def submit(self, task_id: str, payload: Any, priority: int = 0) -> int:
+        """Queue a job and return its 1-based queue position."""
+        with self._condition:
+            entry = [-priority, next(self._counter), task_id, payload]
+            self._entries[task_id] = entry
+            heapq.heappush(self._heap, entry)
+            # wake idle workers as well as any worker holding a batching window open
+            self._condition.notify_all()
+            return self._position_locked(entry)
+
+    def discard(self, task_id: str) -> bool:
+        """Remove a job that has not started yet."""
+        with self._condition:
+            entry = self._entries.pop(task_id, None)
+            if entry is None:
+                return False
+            entry[2] = None  # skipped lazily when popped
+            return True
+
+    def clear(self) -> int:
+        """Drop every job that has not started yet and return how many were dropped."""
+        with self._condition:
+            dropped = len(self._entries)
+            for entry in self._entries.values():
+                entry[2] = None
+            self._entries.clear()
+            self._heap = []
+            return dropped
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._entries)
+
+    @property
+    def running_count(self) -> int:
+        return len(self._running)
+
+    @property
+    def reserved_bytes(self) -> int:
+        return self._reserved_bytes
+
+    def _memory_locked(self, payload: Any) -> int:
+        return self.job_memory(payload) if self.memory_budget_bytes else 0
+
+    def position(self, task_id: str) -> Optional[int]:
+        """1-based position of a waiting job, or None if it is not waiting."""
+        with self._condition:
+            entry = self._entries.get(task_id)
+            if entry is None:
+                return None
+            return self._position_locked(entry)
+
+    def eta_seconds(self, task_id: str) -> Optional[float]:
+        """Rough seconds until the job finishes, based on recent job durations."""
+        return self.progress(task_id)[1]
+
+    def progress(self, task_id: str) -> Tuple[Optional[int], Optional[float]]:
+        """Queue position and ETA of a job together, walking the waiting jobs once."""
+        with self._condition:
+            entry = self._entries.get(task_id)
+            position = self._position_locked(entry) if entry is not None else None
+            return position, self._eta_locked(task_id, position)
+
+    def _eta_locked(self, task_id: str, position: Optional[int]) -> Optional[float]:
+        if self._avg_job_seconds is None:
+            return None
+
+        started = self._running.get(task_id)
+        if started is not None:
+            return round(max(self._avg_job_seconds - (time.monotonic() - started), 0.0), 1)
+
+        if position is None:
+            return None
+        jobs_ahead = position - 1 + len(self._running)
+        rounds_to_wait = jobs_ahead // self.max_workers
+        return round((rounds_to_wait + 1) * self._avg_job_seconds, 1)
+
+    def _position_locked(self, entry: list) -> int:
+        key = entry[:2]
+        return 1 + sum(1 for other in self._entries.values() if other[:2] < key)
+
+    def _record_duration(self, seconds: float) -> None:
+        if self._avg_job_seconds is None:
+            self._avg_job_seconds = seconds
+        else:
+            self._avg_job_seconds = 0.8 * self._avg_job_seconds + 0.2 * seconds
+
+    def _pop_locked(self) -> Optional[Job]:
+        while not self._stopped:
+            while self._heap:
+                _, _, task_id, payload = heapq.heappop(self._heap)
+                if task_id is not None:
+                    del self._entries[task_id]
+                    return task_id, payload
+            self._condition.wait()
+        return None
+
+    def _take_compatible_locked(self, key: Any, limit: int, memory_left: Optional[int] = None) -> List[Job]:
+        """Pop waiting jobs in priority order until `limit` matching ones are taken; the others go back on the heap."""
+        taken, skipped = [], []
+        while self._heap and len(taken) < limit:
+            entry = heapq.heappop(self._heap)
+            if entry[2] is None:
+                continue  # discarded
+            if self.batch_key(entry[3]) != key:
+                skipped.append(entry)
+                continue
+            if memory_left is not None:
+                memory = self._memory_locked(entry[3])
+                if memory > memory_left:
+                    skipped.append(entry)
+                    break
+                memory_left -= memory
+            taken.append((entry[2], entry[3]))
+            del self._entries[entry[2]]
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return taken
+
+    def _next_batch(self) -> Optional[Tuple[List[Job], int]]:
+        with self._condition:
+            first = self._pop_locked()
+            if first is None:
+                return None
+
+            batch = [first]
+            memory = self._memory_locked(first[1])
+            if self.batch_key is not None and self.max_batch_size > 1:
+                key = self.batch_key(first[1])
+                deadline = time.monotonic() + self.batch_window
+                while not self._stopped:
+                    memory_left = self.memory_budget_bytes - memory if self.memory_budget_bytes else None
+                    taken = self._take_compatible_locked(key, self.max_batch_size - len(batch), memory_left)
+                    batch.extend(taken)
+                    memory += sum(self._memory_locked(payload) for _, payload in taken)
+                    remaining = deadline - time.monotonic()
+                    if len(batch) >= self.max_batch_size or remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+            # wait until the running batches leave room, a batch on its own always runs
+            if self.memory_budget_bytes and self._reserved_bytes and self._reserved_bytes + memory > self.memory_budget_bytes:
+                print(f"⏳ Batch of {len(batch)} needs {memory // (1024 * 1024)}MB, waiting for running batches to free memory")
+                while not self._stopped and self._reserved_bytes and self._reserved_bytes + memory > self.memory_budget_bytes:
+                    self._condition.wait()
+                if self._stopped:
+                    return None
+            self._reserved_bytes += memory
+
+            started = time.monotonic()
+            for task_id, _ in batch:
+                self._running[task_id] = started
+            return batch, memory
+
+    def _worker_loop(self, worker_id: int) -> None:
+        while True:
+            next_batch = self._next_batch()
+            if next_batch is None:
+                return
+            batch, memory = next_batch
+
+            task_ids = [task_id for task_id, _ in batch]
+            if len(batch) > 1:
+                print(f"📦 Queue worker {worker_id} merged {len(batch)} tasks into one batch")
+
+            completed = False
+            try:
+                completed = self._handler(batch)
+            except Exception as e:
+                print(f"❌ Queue worker {worker_id} failed on tasks {task_ids}: {e}")
+            finally:
+                with self._condition:
+                    started = [self._running.pop(task_id, None) for task_id in task_ids][0]
+                    if completed and started is not None:
+                        self._record_duration(time.monotonic() - started)
+                    self._reserved_bytes -= memory
+                    if memory:
+                        self._condition.notify_all()
@@ -0,0 +1,151 @@
+import abc
+import hashlib
+import os
+import shutil
+from typing import Optional, Tuple
+from app.config import IMAGE_STORE, IMAGE_STORE_DIR
+from app.models.db_models import Image
+from app.utils.image_processing import from_data_url
+
+class ImageStore(abc.ABC):
+    """Where the encoded bytes of an `Image` row live.
+
+    The row itself only keeps the storage key, size and mime type; a store
+    decides where the bytes go.
+    """
+
+    def attach(self, image: Image, data: bytes, mime_type: str) -> None:
+        """Store the bytes and record key, size and mime type on the row."""
+        image.storage_key = hashlib.sha256(data).hexdigest()
+        image.size_bytes = len(data)
+        image.mime_type = mime_type
+
+    def attach_thumbnail(self, image: Image, data: bytes, mime_type: str) -> None:
+        """Store thumbnail bytes and record their key and mime type on the row."""
+        image.thumb_key = hashlib.sha256(data).hexdigest()
+        image.thumb_mime_type = mime_type
+
+    @abc.abstractmethod
+    def load(self, image: Image) -> Optional[bytes]:
+        """Bytes of the image, or None if the store no longer has them."""
+
+    @abc.abstractmethod
+    def load_thumbnail(self, image: Image) -> Optional[bytes]:
+        """Bytes of the thumbnail, or None if there is none."""
+
+    def file_path(self, image: Image) -> Optional[str]:
+        """Path that can be streamed straight from disk, if the store has one."""
+        return None
+
+    def thumbnail_path(self, image: Image) -> Optional[str]:
+        return None
+
+    def remove(self, storage_key: str) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+class LocalImageStore(ImageStore):
+    """Content-addressed directory: identical images share one file."""
+
+    def __init__(self, root: str = IMAGE_STORE_DIR):
+        self.root = root
+
+    def _path(self, storage_key: str) -> str:
+        return os.path.join(self.root, storage_key[:2], storage_key)
+
+    def _write(self, storage_key: str, data: bytes) -> None:
+        path = self._path(storage_key)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _read(self, path: Optional[str]) -> Optional[bytes]:
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _existing_path(self, storage_key: Optional[str]) -> Optional[str]:
+        if not storage_key:
+            return None
+        path = self._path(storage_key)
+        return path if os.path.exists(path) else None
+
+    def attach(self, image: Image, data: bytes, mime_type: str) -> None:
+        super().attach(image, data, mime_type)
+        self._write(image.storage_key, data)
+
+    def attach_thumbnail(self, image: Image, data: bytes, mime_type: str) -> None:
+        super().attach_thumbnail(image, data, mime_type)
+        self._write(image.thumb_key, data)
+
+    def load(self, image: Image) -> Optional[bytes]:
+        return self._read(self.file_path(image))
+
+    def load_thumbnail(self, image: Image) -> Optional[bytes]:
+        return self._read(self.thumbnail_path(image))
+
+    def file_path(self, image: Image) -> Optional[str]:
+        return self._existing_path(image.storage_key)
+
+    def thumbnail_path(self, image: Image) -> Optional[str]:
+        return self._existing_path(image.thumb_key)
+
+    def remove(self, storage_key: str) -> None:
+        try:
+            os.remove(self._path(storage_key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        shutil.rmtree(self.root, ignore_errors=True)
+
+class DatabaseImageStore(ImageStore):
+    """Bytes kept in the row's VARBINARY column."""
+
+    def attach(self, image: Image, data: bytes, mime_type: str) -> None:
+        super().attach(image, data, mime_type)
+        image.image_blob = data
+
+    def attach_thumbnail(self, image: Image, data: bytes, mime_type: str) -> None:
+        super().attach_thumbnail(image, data, mime_type)
+        image.thumb_blob = data
+
+    def load(self, image: Image) -> Optional[bytes]:
+        return image.image_blob
+
+    def load_thumbnail(self, image: Image) -> Optional[bytes]:
+        return image.thumb_blob
+
+def create_image_store(kind: str = IMAGE_STORE) -> ImageStore:
+    if kind == "local":
+        return LocalImageStore()
+    if kind == "database":
+        return DatabaseImageStore()
+    raise ValueError(f"Unknown IMAGE_STORE '{kind}', expected 'local' or 'database'")
+
+image_store = create_image_store()
+
+def load_image_bytes(image: Image) -> Optional[Tuple[bytes, str]]:
+    """Bytes and mime type of a row, including legacy rows that hold a base64 data URL."""
+    if image.storage_key:
+        data = image_store.load(image)
+        if data is not None:
+            return data, image.mime_type or "image/png"
+    if image.image_data:
+        return from_data_url(image.image_data)
+    return None
+
+def load_thumbnail_bytes(image: Image) -> Optional[Tuple[bytes, str]]:
+    """Thumbnail bytes and mime type, falling back to the full image for rows without a thumbnail."""
+    if image.thumb_key:
+        data = image_store.load_thumbnail(image)
+        if data is not None:
+            return data, image.thumb_mime_type or "image/webp"
+    return load_image_bytes(image)
@@ -0,0 +1,55 @@
+from dataclasses import dataclass
+from app.config import DEVICE
+from app.core.model_loader import CPU_PROFILE
+from app.models import GenerateRequest
+
+# Rough coefficients for Stable Diffusion 2.x sized UNets and VAEs, per sample and byte of activation dtype
+UNET_BYTES_PER_LATENT_PIXEL = 36_000  # activations kept alive during one UNet pass
+VAE_BYTES_PER_PIXEL = 384  # decoder feature maps at full resolution
+# Attention heads whose score matrices exist at once: none with memory-efficient SDPA, a slice of heads with attention slicing
+ATTENTION_HEADS_MATERIALIZED = {"cuda": 0, "mps": 5, "cpu": 2}
+REFERENCE_LATENT_PIXELS = 64 * 64  # a 512x512 image
+
+@dataclass
+class JobEstimate:
+    memory_bytes: int  # peak memory of one request on top of the model weights
+    cost: float  # compute in 512x512 denoising steps, classifier-free guidance counted as two
+
+    @property
+    def memory_mb(self) -> int:
+        return self.memory_bytes // (1024 * 1024)
+
+def activation_bytes() -> int:
+    if DEVICE == "cpu":
+        return 2 if CPU_PROFILE.bf16 else 4
+    return 2
+
+def estimate_job(generate_request) -> JobEstimate:
+    """Estimate peak memory and compute of a request from its resolution, steps and guidance.
+
+    The UNet phase grows linearly with the latent size plus quadratically for attention
+    scores where they are materialized; the VAE decode runs afterwards at full resolution.
+    """
+    latent_pixels = (generate_request.width // 8) * (generate_request.height // 8)
+    unet_samples = 2 if generate_request.guidance_scale > 1 else 1  # conditional and unconditional pass
+    dtype_bytes = activation_bytes()
+
+    attention_heads = ATTENTION_HEADS_MATERIALIZED.get(DEVICE, 0)
+    unet_bytes = unet_samples * dtype_bytes * (
+        latent_pixels * UNET_BYTES_PER_LATENT_PIXEL + attention_heads * latent_pixels ** 2
+    )
+    vae_bytes = dtype_bytes * generate_request.width * generate_request.height * VAE_BYTES_PER_PIXEL
+
+    return JobEstimate(
+        memory_bytes=max(unet_bytes, vae_bytes),
+        cost=round(generate_request.steps * unet_samples * latent_pixels / REFERENCE_LATENT_PIXELS, 2)
+    )
+
+def job_memory_bytes(generate_request) -> int:
+    return estimate_job(generate_request).memory_bytes
+
+def largest_job_bytes() -> int:
+    """Estimated memory of the largest request GenerateRequest accepts"""
+    fields = GenerateRequest.__fields__
+    largest = GenerateRequest(prompt="", width=fields["width"].field_info.le, height=fields["height"].field_info.le)
+    return job_memory_bytes(largest)
@@ -1,18 +1,158 @@
+import os
+import threading
+import time
 import torch
+from contextlib import contextmanager
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional
 from diffusers import StableDiffusionPipeline
-from app.config import DEVICE
+from app.config import (
+    CPU_BF16,
+    CPU_CHANNELS_LAST,
+    CPU_THREADS_PER_JOB,
+    CPU_TORCH_COMPILE,
+    DEFAULT_MODEL,
+    DEVICE,
+    MAX_CONCURRENT_JOBS,
+    MODEL_CACHE_DIR,
+    MODEL_IDLE_UNLOAD_SECONDS,
+    MODEL_LOAD_RETRY_SECONDS,
+    MODEL_MEMORY_BUDGET_MB,
+    MODEL_NAME,
+    MODEL_WARMUP,
+    MODEL_WARMUP_STEPS,
+    MODEL_WORKER_MODE,
+    MODEL_WORKERS,
+    MODELS,
+    PIPELINE_BACKEND
+)
+from app.core.prompt_cache import prompt_cache
+from app.core.samplers import build_schedulers, job_pipeline
 import gc
 
-def load_model():
+class ModelState(str, Enum):
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    UNLOADED = "unloaded"  # freed after being idle or evicted, reloaded on the next request
+    FAILED = "failed"
+
+# States in which the model serves (or transparently reloads for) new requests
+SERVING_STATES = (ModelState.READY, ModelState.UNLOADED)
+
+MODEL_LOAD_RETRY_MAX_SECONDS = 600
+
+def load_retry_delay(failures: int) -> Optional[float]:
+    """Seconds to wait before retrying after `failures` failed loads in a row, None when retries are disabled"""
+    if MODEL_LOAD_RETRY_SECONDS <= 0:
+        return None
+    return min(MODEL_LOAD_RETRY_MAX_SECONDS, MODEL_LOAD_RETRY_SECONDS * 2 ** max(0, failures - 1))
+
+# Pipeline components that may be shared between models, with the stem of their weights file
+SHAREABLE_COMPONENTS = {"vae": "diffusion_pytorch_model", "text_encoder": "model"}
+
+def _torch_dtype():
+    return torch.float16 if DEVICE in ["cuda", "mps"] else torch.float32
+
+def _variant() -> Optional[str]:
+    return "fp16" if _torch_dtype() == torch.float16 else None
+
+@dataclass
+class CpuProfile:
+    """How pipelines are tuned for CPU inference"""
+    bf16: bool = False  # run the pipeline under bfloat16 autocast
+    channels_last: bool = False
+    compile_unet: bool = False
+    threads: Optional[int] = None  # torch intra-op threads per job, None keeps torch's default
+
+    def describe(self) -> str:
+        enabled = [name for name in ("bf16", "channels_last", "compile_unet") if getattr(self, name)]
+        return f"{'+'.join(enabled) or 'fp32'}, {self.threads or torch.get_num_threads()} threads"
+
+def cpu_supports_bf16() -> bool:
+    """Whether the CPU computes bfloat16 natively (AVX512-BF16 or AMX); emulated bf16 is slower than fp32"""
+    native_checks = [
+        getattr(torch.cpu, "_is_avx512_bf16_supported", None),
+        getattr(torch.cpu, "_is_amx_tile_supported", None)
+    ]
+    native_checks = [check for check in native_checks if check is not None]
     try:
-        torch_dtype = torch.float16 if DEVICE in ["cuda", "mps"] else torch.float32
+        if native_checks:
+            return any(check() for check in native_checks)
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except Exception:
+        return False
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))  # respects container CPU sets
+    return os.cpu_count() or 1
 
+def cpu_profile_from_config() -> CpuProfile:
+    """Profile from the CPU_* settings; the cores are split between the jobs that can run at once"""
+    concurrent_jobs = MODEL_WORKERS if MODEL_WORKER_MODE == "process" else MAX_CONCURRENT_JOBS
+    return CpuProfile(
+        bf16=cpu_supports_bf16() if CPU_BF16 == "auto" else CPU_BF16 == "true",
+        channels_last=CPU_CHANNELS_LAST,
+        compile_unet=CPU_TORCH_COMPILE,
+        threads=CPU_THREADS_PER_JOB or max(1, available_cores() // max(1, concurrent_jobs))
+    )
+
+CPU_PROFILE = cpu_profile_from_config() if DEVICE == "cpu" else CpuProfile()
+
+def apply_cpu_profile(pipe, profile: CpuProfile):
+    """Set thread count, memory format and compilation of a freshly loaded CPU pipeline"""
+    print(f"🧮 CPU profile: {profile.describe()}")
+    if profile.threads:
+        # each job thread gets a team of this size, so concurrent jobs together use about all cores
+        torch.set_num_threads(profile.threads)
+    if profile.channels_last:
+        pipe.unet.to(memory_format=torch.channels_last)
+        pipe.vae.to(memory_format=torch.channels_last)
+    if profile.compile_unet:
+        pipe.unet = torch.compile(pipe.unet)
+    return pipe
+
+@contextmanager
+def inference_context(profile: CpuProfile = CPU_PROFILE) -> Iterator[None]:
+    """Per-call CPU settings: the job thread's intra-op thread count and bfloat16 autocast"""
+    if DEVICE == "cpu" and profile.threads and torch.get_num_threads() != profile.threads:
+        torch.set_num_threads(profile.threads)  # OpenMP settings are per calling thread
+    with torch.autocast("cpu", dtype=torch.bfloat16, enabled=DEVICE == "cpu" and profile.bf16):
+        yield
+
+def load_model(
+    repo_id: str = MODEL_NAME,
+    local_files_only: bool = False,
+    components: Optional[Dict[str, Any]] = None,
+    cpu_profile: CpuProfile = CPU_PROFILE
+):
+    """Load the pipeline from safetensors weights, memory-mapped from the local Hugging Face cache.
+
+    `local_files_only` skips the hub round trips once the weights are known to be cached.
+    `components` are already loaded modules (e.g. a shared VAE) used instead of loading them again.
+    On CPU the pipeline is tuned according to `cpu_profile`. With PIPELINE_BACKEND=stub
+    no weights are loaded and a StubPipeline stands in for the model.
+    """
+    if PIPELINE_BACKEND == "stub":
+        from app.core.stub_pipeline import StubPipeline
+        return StubPipeline(repo_id)
+    if PIPELINE_BACKEND != "diffusers":
+        raise ValueError(f"Unknown PIPELINE_BACKEND '{PIPELINE_BACKEND}', expected 'diffusers' or 'stub'")
+
+    try:
         pipe = StableDiffusionPipeline.from_pretrained(
-            "stabilityai/stable-diffusion-2-1",
-            torch_dtype=torch_dtype,
+            repo_id,
+            torch_dtype=_torch_dtype(),
             safety_checker=None,
             use_xformers=False,
-            variant="fp16" if torch_dtype == torch.float16 else None
+            variant=_variant(),
+            use_safetensors=True,
+            low_cpu_mem_usage=True,
+            cache_dir=MODEL_CACHE_DIR,
+            local_files_only=local_files_only,
+            **(components or {})
         )
 
         if DEVICE == "cuda":
@@ -20,6 +160,7 @@ def load_model():
             torch.backends.cuda.enable_mem_efficient_sdp(True)
         elif DEVICE == "cpu":
             pipe.enable_attention_slicing()
+            return apply_cpu_profile(pipe.to(DEVICE), cpu_profile)
 
         return pipe.to(DEVICE)
 
@@ -27,26 +168,224 @@ def load_model():
         print(f"❌ Model loading failed: {str(e)}")
         raise
 
+def component_fingerprint(repo_id: str, component: str, local_files_only: bool = False) -> Optional[str]:
+    """Identity of a component's weights, equal between repositories that ship the same file.
+
+    Files in the Hugging Face cache are symlinks to blobs named after their hash, so
+    the blob name identifies the weights without reading them. None when unknown.
+    """
+    if PIPELINE_BACKEND == "stub":
+        return None
+    from huggingface_hub import hf_hub_download
+
+    stem = SHAREABLE_COMPONENTS[component]
+    filename = f"{stem}.{_variant()}.safetensors" if _variant() else f"{stem}.safetensors"
+    try:
+        path = hf_hub_download(
+            repo_id, filename, subfolder=component, cache_dir=MODEL_CACHE_DIR, local_files_only=local_files_only
+        )
+    except Exception:
+        return None
+    return os.path.basename(os.path.realpath(path))
+
+def pipeline_modules(pipe) -> Dict[int, torch.nn.Module]:
+    """The torch modules of a pipeline by identity, so modules shared between pipelines count once."""
+    return {
+        id(component): component
+        for component in getattr(pipe, "components", {}).values()
+        if isinstance(component, torch.nn.Module)
+    }
+
+def module_bytes(module: torch.nn.Module) -> int:
+    tensors = list(module.parameters()) + list(module.buffers())
+    return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+def warm_up(pipe) -> float:
+    """Run a tiny throwaway inference so kernels, allocators and caches are initialized; returns seconds taken."""
+    start = time.perf_counter()
+    with torch.inference_mode(), inference_context():
+        pipe(prompt="warm-up", num_inference_steps=MODEL_WARMUP_STEPS, height=256, width=256)
+    return round(time.perf_counter() - start, 2)
+
 class ModelLoader:
-    def __init__(self):
+    """Owns one pipeline: background load, idle unload and transparent reload.
+
+    Jobs hold the pipeline through `use()`, which counts them as in flight; the
+    idle watcher only unloads when nothing is in flight and nothing used the
+    model for `idle_unload_seconds`. Loads and unloads are serialized by `_lock`,
+    while `_usage_lock` is only held briefly to count jobs, so jobs on a loaded
+    model start without waiting for another load. A loader created by a
+    ModelRegistry shares the registry's locks and lets it make room and share
+    components on load.
+    """
+
+    def __init__(
+        self,
+        name: str = DEFAULT_MODEL,
+        repo_id: str = MODEL_NAME,
+        idle_unload_seconds: float = MODEL_IDLE_UNLOAD_SECONDS,
+        registry: Optional["ModelRegistry"] = None
+    ):
+        self.name = name
+        self.repo_id = repo_id
+        self.registry = registry
         self.pipe = None
         self.is_loaded = False
-    
+        self.state = ModelState.NOT_LOADED
+        self.error: Optional[str] = None
+        self.failures = 0  # failed loads in a row
+        self.failed_at: Optional[float] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.idle_unload_seconds = idle_unload_seconds
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+        self.loads = 0
+        self.unloads = 0
+        self.load_seconds_total = 0.0
+        self.size_bytes: Optional[int] = None  # measured on the last load, shared components included
+        self.fingerprints: Dict[str, Optional[str]] = {}
+        self.schedulers: Dict[str, Any] = {}  # per sampler, built from the loaded pipeline's config
+        self._weights_cached = False
+        self._lock = registry._lock if registry is not None else threading.RLock()
+        self._usage_lock = registry._usage_lock if registry is not None else threading.Lock()
+
     def load(self):
-        """Load the model and store it as an instance attribute"""
-        if not self.is_loaded:
-            print("🔄 Loading model...")
-            self.pipe = load_model()
+        """Load the model and store it as an instance attribute; concurrent callers wait for the same load"""
+        with self._lock:
+            if self.is_loaded:
+                return self.pipe
+            print(f"🔄 Loading model {self.name} ({self.repo_id})...")
+            self.state = ModelState.LOADING
+            self.error = None
+            start = time.perf_counter()
+            try:
+                components = self.registry.prepare_load(self) if self.registry is not None else None
+                pipe = load_model(self.repo_id, local_files_only=self._weights_cached, components=components)
+                if MODEL_WARMUP:
+                    self.warmup_seconds = warm_up(pipe)
+                    print(f"🔥 Model warm-up took {self.warmup_seconds}s")
+            except Exception as e:
+                self.state = ModelState.FAILED
+                self.error = str(e)
+                self.failures += 1
+                self.failed_at = time.monotonic()
+                raise
+            self.failures = 0
+            self.schedulers = build_schedulers(pipe)
+            self.pipe = pipe
             self.is_loaded = True
-            print("✅ Model loaded successfully")
-        return self.pipe
-    
+            self._weights_cached = True
+            self.size_bytes = sum(module_bytes(module) for module in pipeline_modules(pipe).values())
+            self.load_seconds = round(time.perf_counter() - start, 2)
+            self.loads += 1
+            self.load_seconds_total += self.load_seconds
+            self.last_used = time.monotonic()
+            self.state = ModelState.READY
+            print(f"✅ Model {self.name} loaded successfully in {self.load_seconds}s")
+            if self.registry is not None:
+                self.registry.enforce_budget(keep=self)
+            return self.pipe
+
+    def retry_in(self) -> Optional[float]:
+        """Seconds until a failed load may be retried (0 when it may now), None when it is never retried"""
+        delay = load_retry_delay(self.failures)
+        if delay is None:
+            return None
+        return max(0.0, self.failed_at + delay - time.monotonic())
+
+    def load_in_background(self) -> threading.Thread:
+        """Start loading on a daemon thread so startup is not blocked; failures are kept in `state`/`error`
+        and retried with a growing delay, so a transient error (e.g. a failed download) does not stick"""
+        def run():
+            while True:
+                try:
+                    self.load()
+                    return
+                except Exception:
+                    pass  # reported through state and /readyz
+                retry_in = self.retry_in()
+                if retry_in is None:
+                    return
+                print(f"🔁 Retrying to load model {self.name} in {retry_in:.0f}s")
+                time.sleep(retry_in)
+
+        self.state = ModelState.LOADING
+        thread = threading.Thread(target=run, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+
     def get_model(self):
-        """Get the loaded model, load if not already loaded"""
+        """Get the loaded model, load if not already loaded; a failed load is retried once its delay has passed"""
+        if self.state == ModelState.FAILED:
+            retry_in = self.retry_in()
+            if retry_in is None or retry_in > 0:
+                when = "" if retry_in is None else f", retrying in {retry_in:.0f}s"
+                raise RuntimeError(f"Model {self.name} failed to load: {self.error}{when}")
         if not self.is_loaded:
             return self.load()
         return self.pipe
-    
+
+    @contextmanager
+    def use(self) -> Iterator[Any]:
+        """Hold the pipeline for one job, reloading it first if it was unloaded"""
+        with self._usage_lock:
+            self.in_flight += 1
+        try:
+            yield self.get_model()
+        finally:
+            with self._usage_lock:
+                self.in_flight -= 1
+                self.last_used = time.monotonic()
+
+    def unload(self, reason: str) -> bool:
+        """Free the pipeline unless a job holds it"""
+        with self._lock:
+            with self._usage_lock:
+                if not self.is_loaded or self.in_flight:
+                    return False
+                # from here on new jobs wait for a reload instead of picking up the pipe being freed
+                self.is_loaded = False
+            print(f"💤 Unloading model {self.name}: {reason}")
+            if self.cleanup():
+                self.unloads += 1
+                self.state = ModelState.UNLOADED
+                return True
+            return False
+
+    def unload_if_idle(self) -> bool:
+        """Free the pipeline when no job holds it and it has been idle long enough"""
+        with self._lock:
+            idle_for = time.monotonic() - self.last_used
+            if idle_for < self.idle_unload_seconds:
+                return False
+            return self.unload(f"idle for {idle_for:.0f}s")
+
+    @property
+    def encoder_key(self) -> str:
+        """Prompt embedding cache key: the text encoder weights, shared encoders share entries"""
+        return self.fingerprints.get("text_encoder") or self.repo_id
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds
+        }
+
+    def metrics(self) -> Dict[str, float]:
+        label = f'{{model="{self.name}"}}'
+        return {
+            f"model_loaded{label}": 1 if self.is_loaded else 0,
+            f"model_in_flight{label}": self.in_flight,
+            f"model_idle_seconds{label}": round(time.monotonic() - self.last_used, 1),
+            f"model_loads_total{label}": self.loads,
+            f"model_unloads_total{label}": self.unloads,
+            f"model_load_seconds_total{label}": round(self.load_seconds_total, 2),
+            f"model_last_load_seconds{label}": self.load_seconds or 0
+        }
+
     def cleanup(self):
         """Clean up model resources and free memory"""
         print("🧹 ENTERING cleanup method", flush=True)
@@ -54,39 +393,45 @@ class ModelLoader:
         print(f"🧹 self.is_loaded: {self.is_loaded}", flush=True)
         print(f"🧹 DEVICE: {DEVICE}", flush=True)
         print(f"🧹 torch.cuda.is_available(): {torch.cuda.is_available()}", flush=True)
-        
+
         try:
             if self.pipe is not None:
                 print("🧹 Pipe exists, starting cleanup...", flush=True)
-                
-                # Move to CPU first if using CUDA to properly release GPU memory
+
+                # Move to CPU first if using CUDA to properly release GPU memory,
+                # except for components another resident model still uses
                 if DEVICE != "cpu":
                     print("🧹 Moving model to CPU...", flush=True)
-                    self.pipe = self.pipe.to("cpu")
+                    shared = self.registry.shared_module_ids(self) if self.registry is not None else set()
+                    for module_id, module in pipeline_modules(self.pipe).items():
+                        if module_id not in shared:
+                            module.to("cpu")
                     print("🧹 Model moved to CPU", flush=True)
-                
+
                 print("🧹 Deleting pipe...", flush=True)
                 del self.pipe
                 self.pipe = None
+                self.schedulers = {}
                 self.is_loaded = False
+                self.state = ModelState.NOT_LOADED
                 print("🧹 Pipe deleted and flags reset", flush=True)
-                
+
                 print("🧹 Running garbage collection...", flush=True)
                 gc.collect()
                 print("🧹 Garbage collection completed", flush=True)
-                
+
                 if torch.cuda.is_available():
                     print("🧹 Clearing CUDA cache...", flush=True)
                     torch.cuda.empty_cache()
                     torch.cuda.ipc_collect()
                     print("🧹 CUDA cache cleared", flush=True)
-                
+
                 print("✅ Model resources cleaned up", flush=True)
                 return True
             else:
                 print("ℹ️  No cleanup needed (pipe was None)", flush=True)
-                return True  
-            
+                return True
+
         except Exception as e:
             print(f"❌ Model cleanup failed: {e}", flush=True)
             import traceback
@@ -95,9 +440,176 @@ class ModelLoader:
         finally:
             print("🧹 EXITING cleanup method", flush=True)
 
-model_loader = ModelLoader()
+class ModelRegistry:
+    """The models selectable per request, kept resident within a memory budget.
 
-def cleanup_models():
-    """Clean up model resources - to be called by midnight cleanup & shutdown"""
-    return model_loader.cleanup()
+    Loading a model first evicts least recently used idle models until its
+    expected size fits `memory_budget_bytes`; models in use by a job are never
+    evicted. A VAE or text encoder whose weights file is identical to one of a
+    resident model is reused instead of being loaded a second time, and counts
+    once against the budget. The registry's state and status are those of the
+    default model, which is what readiness reports on.
+    """
+
+    def __init__(
+        self,
+        models: Dict[str, str] = MODELS,
+        default: str = DEFAULT_MODEL,
+        memory_budget_mb: int = MODEL_MEMORY_BUDGET_MB,
+        idle_unload_seconds: float = MODEL_IDLE_UNLOAD_SECONDS
+    ):
+        if default not in models:
+            raise ValueError(f"Default model '{default}' is not one of {list(models)}")
+        self.default = default
+        self.memory_budget_bytes = memory_budget_mb * 1024 * 1024
+        self.idle_unload_seconds = idle_unload_seconds
+        self.evictions = 0
+        self.shared_loads = 0
+        self._lock = threading.RLock()
+        self._usage_lock = threading.Lock()
+        self._reused: set = set()  # modules the model being loaded takes over from resident ones
+        self._watcher: Optional[threading.Thread] = None
+        self.loaders: Dict[str, ModelLoader] = {
+            name: ModelLoader(name, repo_id, idle_unload_seconds, registry=self)
+            for name, repo_id in models.items()
+        }
+
+    def resolve(self, name: Optional[str]) -> str:
+        """The registered name for a request's `model`, the default when unset; KeyError if unknown"""
+        if name is None:
+            return self.default
+        if name not in self.loaders:
+            raise KeyError(f"Unknown model '{name}', available: {', '.join(self.loaders)}")
+        return name
+
+    def get(self, name: Optional[str] = None) -> ModelLoader:
+        return self.loaders[self.resolve(name)]
+
+    def get_model(self, name: Optional[str] = None):
+        return self.get(name).get_model()
+
+    @contextmanager
+    def use(self, name: Optional[str] = None, sampler: str = "default") -> Iterator[Any]:
+        """Hold a model for one job and yield a pipeline running the requested sampler"""
+        loader = self.get(name)
+        with loader.use() as pipe:
+            yield job_pipeline(pipe, loader.schedulers, sampler)
 
+    def _resident(self, exclude: Optional[ModelLoader] = None) -> List[ModelLoader]:
+        return [loader for loader in self.loaders.values() if loader.is_loaded and loader is not exclude]
+
+    def resident_bytes(self) -> int:
+        modules: Dict[int, torch.nn.Module] = {}
+        for loader in self._resident():
+            modules.update(pipeline_modules(loader.pipe))
+        return sum(module_bytes(module) for module in modules.values())
+
+    def shared_module_ids(self, loader: ModelLoader) -> set:
+        """Modules of `loader` that another resident model, or the model being loaded, also uses"""
+        others = set(self._reused)
+        for other in self._resident(exclude=loader):
+            others.update(pipeline_modules(other.pipe))
+        return set(pipeline_modules(loader.pipe)) & others
+
+    def prepare_load(self, loader: ModelLoader) -> Dict[str, Any]:
+        """Find components to share with resident models and make room for the rest; called with the lock held"""
+        loader.fingerprints = {
+            component: component_fingerprint(loader.repo_id, component, local_files_only=loader._weights_cached)
+            for component in SHAREABLE_COMPONENTS
+        }
+        components = {}
+        for component, fingerprint in loader.fingerprints.items():
+            if fingerprint is None:
+                continue
+            for other in self._resident(exclude=loader):
+                if other.fingerprints.get(component) == fingerprint:
+                    components[component] = getattr(other.pipe, component)
+                    break
+        if components:
+            self.shared_loads += 1
+            print(f"🔗 Model {loader.name} reuses {sorted(components)} of resident models")
+
+        expected = loader.size_bytes or max((other.size_bytes or 0 for other in self.loaders.values()), default=0)
+        expected -= sum(module_bytes(module) for module in components.values())
+        self._reused = {id(module) for module in components.values()}
+        try:
+            self.enforce_budget(keep=loader, incoming_bytes=max(0, expected))
+        finally:
+            self._reused = set()
+        return components
+
+    def enforce_budget(self, keep: ModelLoader, incoming_bytes: int = 0) -> None:
+        """Evict least recently used idle models until resident models plus `incoming_bytes` fit the budget"""
+        if self.memory_budget_bytes <= 0:
+            return
+        while self.resident_bytes() + incoming_bytes > self.memory_budget_bytes:
+            candidates = [loader for loader in self._resident(exclude=keep) if not loader.in_flight]
+            if not candidates:
+                print(f"⚠️  Models exceed the memory budget of {self.memory_budget_bytes // (1024 * 1024)}MB, nothing idle to evict")
+                return
+            victim = min(candidates, key=lambda loader: loader.last_used)
+            if not victim.unload(f"evicted to make room for {keep.name}"):
+                return
+            self.evictions += 1
+
+    @property
+    def state(self) -> ModelState:
+        return self.get().state
+
+    @property
+    def error(self) -> Optional[str]:
+        return self.get().error
+
+    def load_in_background(self) -> threading.Thread:
+        return self.get().load_in_background()
+
+    def start_idle_watcher(self) -> None:
+        """Check every model for idleness in the background; disabled when `idle_unload_seconds` is 0"""
+        if self.idle_unload_seconds <= 0 or self._watcher is not None:
+            return
+
+        def watch():
+            interval = min(60.0, max(1.0, self.idle_unload_seconds / 4))
+            while True:
+                time.sleep(interval)
+                for loader in list(self.loaders.values()):
+                    try:
+                        loader.unload_if_idle()
+                    except Exception as e:
+                        print(f"⚠️  Idle unload check failed for {loader.name}: {e}")
+
+        self._watcher = threading.Thread(target=watch, name="model-idle-watcher", daemon=True)
+        self._watcher.start()
+        print(f"✅ Model idle unload after {self.idle_unload_seconds}s")
+
+    def status(self) -> Dict[str, Any]:
+        status = self.get().status()
+        status["default"] = self.default
+        status["models"] = {name: loader.state.value for name, loader in self.loaders.items()}
+        return status
+
+    def metrics(self) -> Dict[str, float]:
+        metrics: Dict[str, float] = {}
+        for loader in self.loaders.values():
+            metrics.update(loader.metrics())
+        metrics.update({
+            "model_resident_bytes": self.resident_bytes(),
+            "model_memory_budget_bytes": self.memory_budget_bytes,
+            "model_evictions_total": self.evictions,
+            "model_shared_loads_total": self.shared_loads
+        })
+        metrics.update(prompt_cache.metrics())
+        return metrics
+
+    def cleanup(self) -> bool:
+        """Unload every model"""
+        ok = True
+        for loader in self.loaders.values():
+            ok = loader.cleanup() and ok
+        return ok
+
+model_registry = ModelRegistry()
+
+def cleanup_models():
+    """Clean up model resources - to be called on shutdown"""
+    return model_registry.cleanup()
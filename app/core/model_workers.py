@@ -0,0 +1,297 @@
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+import traceback
+from multiprocessing.connection import Connection
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from app.config import MODEL_WORKERS
+from app.core.model_loader import ModelState, load_retry_delay, model_registry
+from app.core.pipeline_runner import GeneratedImage, run_generation
+from app.models import GenerateRequest
+from app.utils.image_processing import EncodedImage
+
+def _write_shared(chunks: List[bytes]) -> Tuple[str, List[int]]:
+    """Copy byte chunks into one new shared memory block; the reader unlinks it."""
+    shm = SharedMemory(create=True, size=max(1, sum(len(chunk) for chunk in chunks)))
+    offset = 0
+    for chunk in chunks:
+        shm.buf[offset:offset + len(chunk)] = chunk
+        offset += len(chunk)
+    name = shm.name
+    shm.close()
+    return name, [len(chunk) for chunk in chunks]
+
+def _read_shared(name: str, sizes: List[int]) -> List[bytes]:
+    shm = SharedMemory(name=name)
+    try:
+        chunks, offset = [], 0
+        for size in sizes:
+            chunks.append(bytes(shm.buf[offset:offset + size]))
+            offset += size
+        return chunks
+    finally:
+        shm.close()
+        shm.unlink()
+
+def _worker_main(conn: Connection) -> None:
+    """Entry point of a model worker process: load the default model, then serve batches for any registered model."""
+    # Ctrl+C reaches the whole process group; the API process stops its workers itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    try:
+        model_registry.get_model()
+    except Exception as e:
+        conn.send(("failed", str(e)))
+        return
+    conn.send(("ready",))
+    model_registry.start_idle_watcher()
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message[0] == "stop":
+            return
+        if message[0] != "job":
+            continue  # late cancel for a finished job
+
+        generate_requests = [GenerateRequest(**request) for request in message[1]]
+        cancelled = set()
+
+        def is_live(index: int) -> bool:
+            while conn.poll():
+                command = conn.recv()
+                if command[0] == "cancel":
+                    cancelled.update(command[1])
+            return index not in cancelled
+
+        def on_progress(step: int, progress: float, previews: Dict[int, str]) -> None:
+            conn.send(("progress", step, progress, previews))
+
+        try:
+            loader = model_registry.get(generate_requests[0].model)
+            with model_registry.use(loader.name, generate_requests[0].sampler) as pipe:
+                results = run_generation(pipe, generate_requests, is_live, on_progress, encoder_key=loader.encoder_key)
+        except InterruptedError:
+            conn.send(("cancelled",))
+            continue
+        except Exception as e:
+            traceback.print_exc()
+            conn.send(("error", str(e)))
+            continue
+
+        chunks, layout = [], []
+        for generated in results:
+            if generated is None:
+                layout.append(None)
+                continue
+            chunks += [generated.image.data, generated.thumbnail.data]
+            layout.append((
+                (generated.image.mime_type, generated.image.width, generated.image.height, generated.image.encode_ms),
+                (generated.thumbnail.mime_type, generated.thumbnail.width, generated.thumbnail.height, generated.thumbnail.encode_ms)
+            ))
+        shm_name, sizes = _write_shared(chunks)
+        conn.send(("done", shm_name, sizes, layout, model_registry.metrics()))
+
+class ModelWorker:
+    """Handle on one model-hosting process and the pipe to it."""
+
+    def __init__(self, context, worker_id: int):
+        self.context = context
+        self.worker_id = worker_id
+        self.process = None
+        self.conn: Optional[Connection] = None
+        self.model_metrics: Dict[str, float] = {}  # as of the worker's last finished job
+
+    def start(self) -> None:
+        parent_conn, child_conn = self.context.Pipe()
+        self.conn = parent_conn  # set first: stop() may run while the process is still spawning
+        self.process = self.context.Process(
+            target=_worker_main, args=(child_conn,), name=f"model-worker-{self.worker_id}", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def wait_ready(self) -> bool:
+        try:
+            message = self.conn.recv()
+        except EOFError:
+            message = ("failed", "process exited")
+        if message[0] != "ready":
+            print(f"❌ Model worker {self.worker_id} failed to load the model: {message[1]}")
+            return False
+        print(f"✅ Model worker {self.worker_id} ready (pid {self.process.pid})")
+        return True
+
+    def stop(self, timeout: float = 10.0) -> None:
+        if self.process is None:
+            return
+        try:
+            self.conn.send(("stop",))
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        self.process = None
+
+class ModelWorkerPool:
+    """Runs generation batches in separate processes that each hold a pipeline.
+
+    The API process only exchanges small messages with the workers: the requests
+    going in, per-step progress and previews coming back, and cancellation masks
+    going in while a batch runs. Encoded images come back through a shared memory
+    block instead of being pickled through the pipe.
+    """
+
+    def __init__(self, size: int = MODEL_WORKERS):
+        self.size = size
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = [ModelWorker(self.context, worker_id) for worker_id in range(size)]
+        self._idle: "queue.Queue[ModelWorker]" = queue.Queue()
+        self.state = ModelState.NOT_LOADED
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+
+    def start(self) -> None:
+        """Spawn the workers and wait until each one has loaded its pipeline."""
+        self.state = ModelState.LOADING
+        start = time.perf_counter()
+        for worker in self.workers:
+            worker.start()
+        ready = 0
+        for worker in self.workers:
+            if worker.wait_ready():
+                self._idle.put(worker)
+                ready += 1
+        if not ready:
+            self.state = ModelState.FAILED
+            self.error = "No model worker could load the model"
+            raise RuntimeError(self.error)
+        self.load_seconds = round(time.perf_counter() - start, 2)
+        self.state = ModelState.READY
+        print(f"✅ Model worker pool started with {ready}/{self.size} workers in {self.load_seconds}s")
+
+    def start_in_background(self) -> threading.Thread:
+        """Start the workers on a daemon thread; when none could load, try again with a growing delay"""
+        def run():
+            failures = 0
+            while True:
+                try:
+                    self.start()
+                    return
+                except Exception:
+                    pass  # reported through state and /readyz
+                failures += 1
+                delay = load_retry_delay(failures)
+                if delay is None:
+                    return
+                print(f"🔁 Restarting the model workers in {delay:.0f}s")
+                time.sleep(delay)
+                for worker in self.workers:
+                    worker.stop()
+                self.workers = [ModelWorker(self.context, worker_id) for worker_id in range(self.size)]
+
+        self.state = ModelState.LOADING
+        thread = threading.Thread(target=run, name="model-worker-pool", daemon=True)
+        thread.start()
+        return thread
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state.value,
+            "error": self.error,
+            "load_seconds": self.load_seconds,
+            "workers": self.size
+        }
+
+    def metrics(self) -> Dict[str, float]:
+        """Model metrics of the workers, as reported with their last job.
+
+        Counters (`*_total`) are summed over the workers; gauges are kept per worker
+        with a `worker` label, since adding up idle times or memory budgets means nothing.
+        """
+        merged: Dict[str, float] = {}
+        for worker in self.workers:
+            for name, value in worker.model_metrics.items():
+                base, _, labels = name.partition("{")
+                if base.endswith("_total"):
+                    merged[name] = merged.get(name, 0) + value
+                    continue
+                labels = labels.rstrip("}")
+                worker_label = f'worker="{worker.worker_id}"'
+                merged[f"{base}{{{labels + ',' if labels else ''}{worker_label}}}"] = value
+        return merged
+
+    def _acquire(self) -> "ModelWorker":
+        """Wait for an idle worker, also while the pool is still loading."""
+        while True:
+            if self.state == ModelState.FAILED:
+                raise RuntimeError(f"Model workers unavailable: {self.error}")
+            try:
+                return self._idle.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+    def stop(self) -> None:
+        for worker in self.workers:
+            worker.stop()
+        print("🛑 Model worker pool stopped")
+
+    def run(
+        self,
+        generate_requests: list,
+        is_live: Callable[[int], bool],
+        on_progress: Callable[[int, float, Dict[int, str]], None]
+    ) -> list:
+        """Same contract as `pipeline_runner.run_generation`, executed by an idle worker process."""
+        worker = self._acquire()
+        try:
+            worker.conn.send(("job", [generate_request.dict() for generate_request in generate_requests]))
+            cancelled = set()
+            while True:
+                message = worker.conn.recv()
+                kind = message[0]
+                if kind == "progress":
+                    _, step, progress, previews = message
+                    on_progress(step, progress, previews)
+                    newly_cancelled = [
+                        index for index in range(len(generate_requests))
+                        if index not in cancelled and not is_live(index)
+                    ]
+                    if newly_cancelled:
+                        cancelled.update(newly_cancelled)
+                        worker.conn.send(("cancel", newly_cancelled))
+                elif kind == "cancelled":
+                    raise InterruptedError("Generation cancelled by user")
+                elif kind == "error":
+                    raise RuntimeError(message[1])
+                elif kind == "done":
+                    _, shm_name, sizes, layout, worker.model_metrics = message
+                    chunks = iter(_read_shared(shm_name, sizes))
+                    results = []
+                    for entry in layout:
+                        if entry is None:
+                            results.append(None)
+                            continue
+                        image_meta, thumbnail_meta = entry
+                        results.append(GeneratedImage(
+                            image=EncodedImage(next(chunks), *image_meta),
+                            thumbnail=EncodedImage(next(chunks), *thumbnail_meta)
+                        ))
+                    return results
+        except (EOFError, ConnectionError) as e:
+            print(f"❌ Model worker {worker.worker_id} died: {e}, restarting it")
+            worker.stop(timeout=1.0)
+            worker.start()
+            if not worker.wait_ready():
+                worker = None
+            raise RuntimeError(f"Model worker crashed: {e}")
+        finally:
+            if worker is not None:
+                self._idle.put(worker)
@@ -0,0 +1,103 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+import torch
+from app.config import DEVICE, MAX_OUTPUT_SIZE
+from app.core.model_loader import inference_context
+from app.core.prompt_cache import prompt_cache
+from app.models import GenerateRequest
+from app.utils.image_processing import EncodedImage, create_thumbnail, encode_image
+from app.utils.latent_preview import latents_to_preview_url
+
+# on_progress(step, progress percent, {sample index: preview data URL})
+ProgressCallback = Callable[[int, float, Dict[int, str]], None]
+
+@dataclass
+class GeneratedImage:
+    image: EncodedImage
+    thumbnail: EncodedImage
+
+def wants_preview(generate_request: GenerateRequest, step: int) -> bool:
+    return generate_request.preview and step % generate_request.preview_interval == 0
+
+def encode_generated_image(image, generate_request: GenerateRequest) -> GeneratedImage:
+    """Encode a pipeline output in the requested format together with its gallery thumbnail."""
+    return GeneratedImage(
+        image=encode_image(
+            image,
+            output_format=generate_request.output_format,
+            quality=generate_request.quality,
+            max_width=MAX_OUTPUT_SIZE,
+            max_height=MAX_OUTPUT_SIZE
+        ),
+        thumbnail=create_thumbnail(image)
+    )
+
+def run_generation(
+    pipe,
+    generate_requests: List[GenerateRequest],
+    is_live: Callable[[int], bool],
+    on_progress: ProgressCallback,
+    want_preview: Optional[Callable[[int, int], bool]] = None,
+    encoder_key: Optional[str] = None
+) -> List[Optional[GeneratedImage]]:
+    """Run one batched pipeline call and encode its outputs.
+
+    Samples for which `is_live(index)` turns False are masked: the rest of the batch
+    keeps denoising and the masked slot comes back as None. When no sample is live
+    anymore the call is aborted with InterruptedError. This is the part shared by
+    in-process generation and the out-of-process model workers. Steps, guidance and
+    size come from the first request: a batch only holds requests with the same `batch_key`.
+    With an `encoder_key` (see ModelLoader.encoder_key) and a pipeline that has a text
+    encoder, prompts are encoded through the prompt embedding cache and passed as embeddings.
+    """
+    if want_preview is None:
+        want_preview = lambda index, step: wants_preview(generate_requests[index], step)
+
+    steps = generate_requests[0].steps
+    generators = []
+    for generate_request in generate_requests:
+        generator = torch.Generator(DEVICE)
+        if generate_request.seed is not None:
+            generator.manual_seed(generate_request.seed)
+        else:
+            generator.seed()
+        generators.append(generator)
+
+    def callback(step: int, timestep: int, latents: torch.FloatTensor):
+        """Report progress and previews, abort once every sample was cancelled"""
+        live = [index for index in range(len(generate_requests)) if is_live(index)]
+        if not live:
+            raise InterruptedError("Generation cancelled by user")
+
+        progress = round((step / steps) * 100, 2)
+        previews = {
+            index: latents_to_preview_url(latents[index])
+            for index in live if want_preview(index, step)
+        }
+        on_progress(step, progress, previews)
+
+    prompts = [generate_request.prompt for generate_request in generate_requests]
+    negative_prompts = [generate_request.negative_prompt or "" for generate_request in generate_requests]
+    with inference_context():
+        if encoder_key is not None and getattr(pipe, "text_encoder", None) is not None:
+            text_inputs = {"prompt_embeds": prompt_cache.encode(pipe, encoder_key, prompts)}
+            if generate_requests[0].guidance_scale > 1:
+                text_inputs["negative_prompt_embeds"] = prompt_cache.encode(pipe, encoder_key, negative_prompts)
+        else:
+            text_inputs = {"prompt": prompts, "negative_prompt": negative_prompts if any(negative_prompts) else None}
+
+        images = pipe(
+            **text_inputs,
+            width=generate_requests[0].width,
+            height=generate_requests[0].height,
+            num_inference_steps=steps,
+            guidance_scale=generate_requests[0].guidance_scale,
+            generator=generators,
+            callback=callback,
+            callback_steps=1
+        ).images
+
+    return [
+        encode_generated_image(image, generate_request) if is_live(index) else None
+        for index, (generate_request, image) in enumerate(zip(generate_requests, images))
+    ]
@@ -0,0 +1,79 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+import torch
+from app.config import PROMPT_EMBEDDING_CACHE_SIZE
+
+class PromptEmbeddingCache:
+    """LRU cache of text encoder outputs, keyed by text encoder and prompt text.
+
+    Prompts repeat a lot, and the unconditional (empty) prompt is the same for
+    every request, so most pipeline calls can skip the text encoder. Embeddings
+    stay on the device they were computed on. The key identifies the encoder
+    weights, so models sharing a text encoder also share entries.
+    """
+
+    def __init__(self, max_items: int = PROMPT_EMBEDDING_CACHE_SIZE):
+        self.max_items = max_items
+        self._items: "OrderedDict[Tuple[str, str], torch.Tensor]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, pipe, encoder_key: str, texts: List[str]) -> torch.Tensor:
+        """Embeddings of `texts` stacked as (len(texts), tokens, hidden); only unseen texts go through the encoder"""
+        found: Dict[str, torch.Tensor] = {}
+        with self._lock:
+            for text in texts:
+                embedding = self._items.get((encoder_key, text))
+                if embedding is not None:
+                    self._items.move_to_end((encoder_key, text))
+                    found[text] = embedding
+            missing = list(dict.fromkeys(text for text in texts if text not in found))
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            for text, embedding in zip(missing, self._run_encoder(pipe, missing)):
+                found[text] = embedding
+            if self.max_items > 0:
+                with self._lock:
+                    for text in missing:
+                        self._items[(encoder_key, text)] = found[text]
+                        self._items.move_to_end((encoder_key, text))
+                    while len(self._items) > self.max_items:
+                        self._items.popitem(last=False)
+
+        return torch.stack([found[text] for text in texts])
+
+    @staticmethod
+    @torch.no_grad()
+    def _run_encoder(pipe, texts: List[str]) -> torch.Tensor:
+        """Same tokenization and encoding as the pipeline does for a plain `prompt`"""
+        inputs = pipe.tokenizer(
+            texts,
+            padding="max_length",
+            max_length=pipe.tokenizer.model_max_length,
+            truncation=True,
+            return_tensors="pt"
+        )
+        device = pipe.text_encoder.device
+        attention_mask = None
+        if getattr(pipe.text_encoder.config, "use_attention_mask", False):
+            attention_mask = inputs.attention_mask.to(device)
+        embeddings = pipe.text_encoder(inputs.input_ids.to(device), attention_mask=attention_mask)[0]
+        return embeddings.to(dtype=pipe.text_encoder.dtype)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                "prompt_cache_hits_total": self.hits,
+                "prompt_cache_misses_total": self.misses,
+                "prompt_cache_items": len(self._items)
+            }
+
+prompt_cache = PromptEmbeddingCache()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from app.config import (
+    MODEL_NAME,
+    MODELS,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_DISK_MB,
+    RESULT_CACHE_ENABLED,
+    RESULT_CACHE_MEMORY_ITEMS
+)
+
+CachedImage = Tuple[bytes, str]  # (encoded bytes, mime type)
+
+class ResultCache:
+    """Content-keyed cache of encoded images for seeded generations.
+
+    A small in-memory LRU sits in front of an on-disk tier. Disk entries are named
+    after their key, and the least recently used files are removed once the tier
+    grows past its size budget.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = RESULT_CACHE_ENABLED,
+        max_memory_items: int = RESULT_CACHE_MEMORY_ITEMS,
+        cache_dir: str = RESULT_CACHE_DIR,
+        max_disk_bytes: int = RESULT_CACHE_DISK_MB * 1024 * 1024
+    ):
+        self.enabled = enabled
+        self.max_memory_items = max_memory_items
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: "OrderedDict[str, CachedImage]" = OrderedDict()
+        self._disk: "OrderedDict[str, Tuple[str, int, str]]" = OrderedDict()  # key -> (path, size, mime)
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if self.enabled:
+            self._load_disk_index()
+
+    @staticmethod
+    def make_key(generate_request, model_name: str = MODEL_NAME) -> Optional[str]:
+        """Key for a request, or None when the request is not deterministic (no seed)."""
+        if generate_request.seed is None:
+            return None
+        payload = {
+            "model": MODELS.get(generate_request.model, model_name),
+            "prompt": generate_request.prompt,
+            "negative_prompt": generate_request.negative_prompt,
+            "steps": generate_request.steps,
+            "guidance_scale": generate_request.guidance_scale,
+            "width": generate_request.width,
+            "height": generate_request.height,
+            "seed": generate_request.seed,
+            "output_format": generate_request.output_format,
+            "quality": generate_request.quality
+        }
+        if generate_request.sampler != "default":
+            payload["sampler"] = generate_request.sampler
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: Optional[str]) -> Optional[CachedImage]:
+        """Look a key up in memory first, then on disk (promoting disk hits to memory)."""
+        if not self.enabled or key is None:
+            return None
+
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return cached
+
+            disk_entry = self._disk.get(key)
+            if disk_entry is None:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+
+        path, _, mime_type = disk_entry
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._forget_disk_locked(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self._remember_locked(key, (data, mime_type))
+        return data, mime_type
+
+    def put(self, key: Optional[str], data: bytes, mime_type: str) -> None:
+        """Store an encoded image in both tiers."""
+        if not self.enabled or key is None:
+            return
+
+        with self._lock:
+            self._remember_locked(key, (data, mime_type))
+            if key in self._disk:
+                return
+
+        path = os.path.join(self.cache_dir, f"{key}.{mime_type.split('/')[-1]}")
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️  Result cache could not write {path}: {e}")
+            return
+
+        with self._lock:
+            self._disk[key] = (path, len(data), mime_type)
+            self._disk_bytes += len(data)
+            self._evict_disk_locked()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes
+            }
+
+    def _remember_locked(self, key: str, value: CachedImage) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _forget_disk_locked(self, key: str) -> None:
+        entry = self._disk.pop(key, None)
+        if entry is not None:
+            self._disk_bytes -= entry[1]
+
+    def _evict_disk_locked(self) -> None:
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            key, (path, size, _) = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _load_disk_index(self) -> None:
+        """Rebuild the disk index from the cache directory, oldest access first."""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            key, _, extension = name.partition(".")
+            if not extension or extension.endswith("tmp"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, key, path, stat.st_size, f"image/{extension}"))
+
+        for _, key, path, size, mime_type in sorted(entries):
+            self._disk[key] = (path, size, mime_type)
+            self._disk_bytes += size
+        self._evict_disk_locked()
+        print(f"✅ Result cache loaded {len(self._disk)} entries ({self._disk_bytes} bytes) from {self.cache_dir}")
+
+result_cache = ResultCache()
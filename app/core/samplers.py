@@ -0,0 +1,60 @@
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from diffusers import (
+    DDIMScheduler,
+    DPMSolverMultistepScheduler,
+    EulerAncestralDiscreteScheduler,
+    EulerDiscreteScheduler,
+    UniPCMultistepScheduler
+)
+
+@dataclass
+class Sampler:
+    scheduler_class: Optional[type]  # None: the scheduler the model ships with
+    recommended_steps: int
+    description: str
+    options: Dict[str, Any] = field(default_factory=dict)
+
+# Keys match GenerateRequest.sampler
+SAMPLERS: Dict[str, Sampler] = {
+    "default": Sampler(None, 50, "The scheduler shipped with the model"),
+    "ddim": Sampler(DDIMScheduler, 50, "DDIM, deterministic"),
+    "euler": Sampler(EulerDiscreteScheduler, 30, "Euler"),
+    "euler_a": Sampler(EulerAncestralDiscreteScheduler, 30, "Euler ancestral, adds fresh noise each step"),
+    "dpmpp_2m": Sampler(
+        DPMSolverMultistepScheduler, 20, "DPM-Solver++ (2M), good quality in few steps",
+        {"algorithm_type": "dpmsolver++", "solver_order": 2}
+    ),
+    "dpmpp_2m_karras": Sampler(
+        DPMSolverMultistepScheduler, 20, "DPM-Solver++ (2M) with Karras sigmas, sharper at low step counts",
+        {"algorithm_type": "dpmsolver++", "solver_order": 2, "use_karras_sigmas": True}
+    ),
+    "unipc": Sampler(UniPCMultistepScheduler, 15, "UniPC, the fewest steps for comparable quality")
+}
+
+def build_schedulers(pipe) -> Dict[str, Any]:
+    """One scheduler per sampler, built once from the loaded pipeline's scheduler config."""
+    config = pipe.scheduler.config
+    schedulers = {}
+    for name, sampler in SAMPLERS.items():
+        if sampler.scheduler_class is None:
+            schedulers[name] = pipe.scheduler
+            continue
+        try:
+            schedulers[name] = sampler.scheduler_class.from_config(config, **sampler.options)
+        except Exception as e:
+            print(f"⚠️  Sampler {name} is not available for this model: {e}")
+    return schedulers
+
+def job_pipeline(pipe, schedulers: Dict[str, Any], sampler: str = "default"):
+    """The pipeline to run one job with: same modules, its own copy of the sampler's scheduler.
+
+    Schedulers keep per-run state (timesteps, step index, solver history), so concurrent
+    jobs on one pipeline each get a deep copy; the weights are shared, not copied.
+    """
+    if sampler not in schedulers:
+        raise ValueError(f"Sampler '{sampler}' is not available for this model")
+    job_pipe = copy.copy(pipe)
+    job_pipe.scheduler = copy.deepcopy(schedulers[sampler])
+    return job_pipe
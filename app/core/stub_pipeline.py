@@ -0,0 +1,81 @@
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Union
+import numpy as np
+import torch
+from diffusers import DDIMScheduler
+from PIL import Image
+from app.config import STUB_STEP_MS
+
+BATCH_STEP_FACTOR = 0.3  # each extra sample in a batch adds this share of a single sample's step time
+
+@dataclass
+class StubOutput:
+    images: List[Image.Image]
+
+class StubPipeline:
+    """Stand-in for StableDiffusionPipeline that needs no weights.
+
+    Accepts the same call arguments the service uses, sleeps `step_ms` per
+    denoising step (scaled by resolution and batch size), reports every step to
+    `callback` with latents drawn from the request's generator, and returns
+    synthetic images that depend only on the seed, prompt and size. Used with
+    PIPELINE_BACKEND=stub to exercise queueing, streaming, encoding and storage.
+    """
+
+    def __init__(self, repo_id: str = "stub", step_ms: float = STUB_STEP_MS):
+        self.repo_id = repo_id
+        self.step_ms = step_ms
+        # a real scheduler config, so samplers can be built from it like for a real model
+        self.scheduler = DDIMScheduler(
+            beta_start=0.00085, beta_end=0.012, beta_schedule="scaled_linear",
+            clip_sample=False, set_alpha_to_one=False, steps_offset=1
+        )
+
+    @property
+    def components(self) -> dict:
+        return {"scheduler": self.scheduler}
+
+    def __call__(
+        self,
+        prompt: Union[str, List[str], None] = None,
+        prompt_embeds: Optional[torch.Tensor] = None,
+        width: int = 512,
+        height: int = 512,
+        num_inference_steps: int = 50,
+        generator: Union[torch.Generator, List[torch.Generator], None] = None,
+        callback: Optional[Callable[[int, int, torch.Tensor], None]] = None,
+        callback_steps: int = 1,
+        **kwargs: Any
+    ) -> StubOutput:
+        if prompt is None:
+            prompts = [""] * (len(prompt_embeds) if prompt_embeds is not None else 1)
+        else:
+            prompts = [prompt] if isinstance(prompt, str) else list(prompt)
+        generators = generator if isinstance(generator, list) else [generator] * len(prompts)
+        seeds = [gen.initial_seed() if gen is not None else 0 for gen in generators]
+
+        latents = torch.stack([
+            torch.randn((4, height // 8, width // 8), generator=torch.Generator().manual_seed(seed))
+            for seed in seeds
+        ])
+        step_seconds = (self.step_ms / 1000) * (width * height) / (512 * 512) * (1 + BATCH_STEP_FACTOR * (len(prompts) - 1))
+        for step in range(num_inference_steps):
+            time.sleep(step_seconds)
+            latents = latents * 0.9
+            if callback is not None and step % callback_steps == 0:
+                callback(step, num_inference_steps - step, latents)
+
+        return StubOutput(images=[
+            synthetic_image(seed, text, width, height) for seed, text in zip(seeds, prompts)
+        ])
+
+def synthetic_image(seed: int, prompt: str, width: int, height: int) -> Image.Image:
+    """Deterministic gradient with noise, different for every seed/prompt pair"""
+    digest = hashlib.sha256(f"{seed}:{prompt}".encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+    start, end = rng.integers(0, 256, size=3), rng.integers(0, 256, size=3)
+    ramp = np.linspace(0.0, 1.0, width, dtype=np.float32)[None, :, None]
+    pixels = start + (end - start) * ramp + rng.normal(0, 12, size=(height, width, 3))
+    return Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8), "RGB")
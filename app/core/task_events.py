@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from typing import Callable, Dict, Optional, Set, Tuple
+
+class TaskChannel:
+    """Change notifications for one task, shared by every subscriber of that task.
+
+    Each change bumps `version`, wakes all waiters at once and calls the registered
+    watchers (used by connections multiplexing many tasks). The serialized event
+    for a version is built once and reused by every subscriber.
+    """
+
+    def __init__(self):
+        self.version = 0
+        self.subscribers = 0
+        self.watchers: Set[Callable[[str], None]] = set()
+        self._changed = asyncio.Event()
+        self._snapshot: Optional[Tuple[int, str]] = None
+
+    def notify(self, task_id: str) -> None:
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        for watcher in list(self.watchers):
+            watcher(task_id)
+
+    async def wait_for_change(self, seen_version: int, timeout: Optional[float] = None) -> bool:
+        """Wait until the version moves past `seen_version`, False on timeout."""
+        if self.version != seen_version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def snapshot(self, build: Callable[[], str]) -> str:
+        if self._snapshot is None or self._snapshot[0] != self.version:
+            self._snapshot = (self.version, build())
+        return self._snapshot[1]
+
+class TaskEventBus:
+    """Routes task changes from any thread to the per-task channels on the event loop.
+
+    Publishing for a task nobody watches costs a dict lookup. Bursts of changes
+    for the same task are coalesced into a single wake-up of its channel.
+    """
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._channels: Dict[str, TaskChannel] = {}
+        self._scheduled: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Attach the bus to the running event loop; call from the loop thread."""
+        self._loop = loop
+        self._loop_thread = threading.get_ident()
+
+    def subscribe(self, task_id: str, watcher: Optional[Callable[[str], None]] = None) -> TaskChannel:
+        """Join a task's channel; `watcher(task_id)` is called on the loop for every change."""
+        channel = self._channels.get(task_id)
+        if channel is None:
+            channel = self._channels[task_id] = TaskChannel()
+        channel.subscribers += 1
+        if watcher is not None:
+            channel.watchers.add(watcher)
+        return channel
+
+    def unsubscribe(self, task_id: str, watcher: Optional[Callable[[str], None]] = None) -> None:
+        channel = self._channels.get(task_id)
+        if channel is None:
+            return
+        channel.watchers.discard(watcher)
+        channel.subscribers -= 1
+        if channel.subscribers <= 0:
+            del self._channels[task_id]
+
+    def has_subscribers(self, task_id: str) -> bool:
+        return task_id in self._channels
+
+    def publish(self, task_id: str) -> None:
+        """Signal that a task changed; safe to call from worker threads."""
+        if self._loop is None or task_id not in self._channels:
+            return
+
+        if threading.get_ident() == self._loop_thread:
+            self._notify(task_id)
+            return
+
+        with self._lock:
+            if task_id in self._scheduled:
+                return
+            self._scheduled.add(task_id)
+        try:
+            self._loop.call_soon_threadsafe(self._notify_scheduled, task_id)
+        except RuntimeError:
+            # loop already closed during shutdown
+            with self._lock:
+                self._scheduled.discard(task_id)
+
+    def _notify_scheduled(self, task_id: str) -> None:
+        with self._lock:
+            self._scheduled.discard(task_id)
+        self._notify(task_id)
+
+    def _notify(self, task_id: str) -> None:
+        channel = self._channels.get(task_id)
+        if channel is not None:
+            channel.notify(task_id)
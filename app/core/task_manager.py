@@ -1,10 +1,20 @@
 import asyncio
-from typing import Dict, Any, Optional
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Iterator, Optional, Set
 from datetime import datetime
 import uuid
 import logging
-from dataclasses import dataclass, asdict
 from enum import Enum
+from app.config import (
+    TASK_RESULT_RETENTION_MAX,
+    TASK_RESULT_RETENTION_SECONDS,
+    TASK_RETENTION_MAX,
+    TASK_RETENTION_SECONDS
+)
+from app.core.task_events import TaskEventBus
+from app.core.task_store import InMemoryTaskStore, TaskStore
 
 logger = logging.getLogger(__name__)
 
@@ -15,25 +25,189 @@ class TaskStatus(str, Enum):
     CANCELLED = "cancelled"
     ERROR = "error"
 
-@dataclass
+ONGOING_STATUSES = (TaskStatus.PENDING, TaskStatus.PROCESSING)
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.ERROR)
+
 class TaskInfo:
-    task_id: str
-    status: TaskStatus
-    progress: float
-    created_at: datetime
-    started_at: Optional[datetime] = None
-    completed_at: Optional[datetime] = None
-    request: Optional[Dict] = None
-    result: Optional[Dict] = None
-    error: Optional[str] = None
-    prompt: Optional[str] = None
+    """Compact task record; `__slots__` keeps tens of thousands of tasks cheap to hold."""
+
+    __slots__ = (
+        'task_id', 'status', 'progress', 'created_at', 'started_at', 'completed_at',
+        'request', 'result', 'error', 'prompt', 'cache_hit', 'preview', 'preview_progress'
+    )
+
+    def __init__(
+        self,
+        task_id: str,
+        status: TaskStatus,
+        progress: float,
+        created_at: datetime,
+        started_at: Optional[datetime] = None,
+        completed_at: Optional[datetime] = None,
+        request: Optional[Dict] = None,
+        result: Optional[Dict] = None,
+        error: Optional[str] = None,
+        prompt: Optional[str] = None,
+        cache_hit: bool = False,
+        preview: Optional[str] = None,
+        preview_progress: Optional[float] = None
+    ):
+        self.task_id = task_id
+        self.status = status
+        self.progress = progress
+        self.created_at = created_at
+        self.started_at = started_at
+        self.completed_at = completed_at
+        self.request = request
+        self.result = result
+        self.error = error
+        self.prompt = prompt
+        self.cache_hit = cache_hit
+        self.preview = preview
+        self.preview_progress = preview_progress
+
+    def to_dict(self, include_result: bool = True) -> Dict[str, Any]:
+        """Shallow dict of the record; `result` and `preview` are left out unless asked for."""
+        data = {field: getattr(self, field) for field in self.__slots__}
+        if not include_result:
+            data['result'] = None
+            data['preview'] = None
+        return data
+
+    def __repr__(self) -> str:
+        return f"TaskInfo(task_id={self.task_id!r}, status={self.status!r}, progress={self.progress!r})"
 
 class TaskManager:
-    def __init__(self):
+    """In-memory task registry with a bounded retention policy for finished tasks.
+
+    Finished tasks keep their inline result (the base64 image) for a short while;
+    after that only a reference to the stored image is kept. Finished tasks are
+    removed entirely past a count or age limit. Tasks somebody is still streaming
+    are never touched.
+    """
+
+    def __init__(
+        self,
+        event_bus: Optional[TaskEventBus] = None,
+        retention_max: int = TASK_RETENTION_MAX,
+        retention_seconds: float = TASK_RETENTION_SECONDS,
+        result_retention_max: int = TASK_RESULT_RETENTION_MAX,
+        result_retention_seconds: float = TASK_RESULT_RETENTION_SECONDS,
+        persistence=None,
+        store: Optional[TaskStore] = None
+    ):
         self.task_metadata: Dict[str, TaskInfo] = {}  
+        self.event_bus = event_bus or TaskEventBus()
+        self._by_status: Dict[TaskStatus, Set[str]] = {status: set() for status in TaskStatus}
+        self._lock = threading.RLock()
+        self.retention_max = retention_max
+        self.retention_seconds = retention_seconds
+        self.result_retention_max = result_retention_max
+        self.result_retention_seconds = result_retention_seconds
+        self._finished: "OrderedDict[str, float]" = OrderedDict()  # task_id -> finished at (monotonic)
+        self._with_result: "OrderedDict[str, float]" = OrderedDict()
+        self.persistence = persistence  # TaskPersistence mirroring changes to the database, if any
+        self.store = store or InMemoryTaskStore()
+        self.store.watch(self.apply_remote)
+
+    def _publish(self, task_id: str) -> None:
+        """Notify stream subscribers and other API processes that a task changed."""
+        self.event_bus.publish(task_id)
+        task_info = self.task_metadata.get(task_id)
+        if task_info is not None:
+            self.store.save(task_info)
+
+    def apply_remote(self, data: Dict[str, Any]) -> Optional[TaskInfo]:
+        """Merge a task state written by another process, without writing it back."""
+        status = TaskStatus(data["status"])
+        with self._lock:
+            task_info = self.task_metadata.get(data["task_id"])
+            if task_info is None:
+                task_info = TaskInfo(**{**data, "status": status})
+                self.task_metadata[task_info.task_id] = task_info
+                self._by_status[status].add(task_info.task_id)
+                if status in TERMINAL_STATUSES:
+                    self._finished[task_info.task_id] = time.monotonic()
+                    self._with_result[task_info.task_id] = time.monotonic()
+            elif task_info.status in TERMINAL_STATUSES and status not in TERMINAL_STATUSES:
+                return task_info  # stale
+            else:
+                for field in TaskInfo.__slots__:
+                    if field != "status" and field in data:
+                        setattr(task_info, field, data[field])
+                if task_info.status != status:
+                    self._set_status(task_info, status)
+        self.event_bus.publish(task_info.task_id)
+        return task_info
+
+    def _changed(self, task_id: str) -> None:
+        """Notify subscribers and persist a status-level change."""
+        self._publish(task_id)
+        if self.persistence is not None:
+            self.persistence.task_changed(self.task_metadata[task_id])
+
+    def _set_status(self, task_info: TaskInfo, status: TaskStatus) -> None:
+        """Move a task between the per-status indexes."""
+        with self._lock:
+            self._by_status[task_info.status].discard(task_info.task_id)
+            self._by_status[status].add(task_info.task_id)
+            task_info.status = status
+            if status in TERMINAL_STATUSES and task_info.task_id not in self._finished:
+                now = time.monotonic()
+                self._finished[task_info.task_id] = now
+                self._with_result[task_info.task_id] = now
+
+    def _remove(self, task_id: str) -> None:
+        with self._lock:
+            task_info = self.task_metadata.pop(task_id, None)
+            if task_info is not None:
+                self._by_status[task_info.status].discard(task_id)
+            self._finished.pop(task_id, None)
+            self._with_result.pop(task_id, None)
+
+    def _offload_result(self, task_id: str) -> None:
+        """Drop the inline image and live preview; the image stays reachable through its raw_url."""
+        task_info = self.task_metadata.get(task_id)
+        if task_info is None:
+            return
+        task_info.preview = None
+        if task_info.result and "image_url" in task_info.result:
+            task_info.result = {key: value for key, value in task_info.result.items() if key != "image_url"}
+
+    def _expired(self, entries: "OrderedDict[str, float]", max_entries: int, max_age: float, now: float) -> list:
+        """Oldest entries past the count or age limit, skipping tasks that are being streamed."""
+        expired = []
+        overflow = len(entries) - max_entries
+        for task_id, finished_at in entries.items():
+            if overflow <= 0 and now - finished_at < max_age:
+                break
+            overflow -= 1
+            if not self.event_bus.has_subscribers(task_id):
+                expired.append(task_id)
+        return expired
+
+    def prune(self) -> Dict[str, int]:
+        """Apply the retention policy to finished tasks and return what was done."""
+        now = time.monotonic()
+        with self._lock:
+            offloaded = self._expired(self._with_result, self.result_retention_max, self.result_retention_seconds, now)
+            for task_id in offloaded:
+                self._with_result.pop(task_id, None)
+                self._offload_result(task_id)
+
+            evicted = self._expired(self._finished, self.retention_max, self.retention_seconds, now)
+            for task_id in evicted:
+                self._remove(task_id)
+
+        if offloaded or evicted:
+            print(f"🧹 Task retention: offloaded {len(offloaded)} results, evicted {len(evicted)} tasks")
+        return {"results_offloaded": len(offloaded), "tasks_evicted": len(evicted)}
 
     def create_task(self, request: Dict, prompt: str) -> str:
-        """Create a new task with metadata and return its ID."""
+        """Create a new task with metadata and return its ID.
+
+        The database row is queued first, so a task the writer refuses (WriterBacklogged) is never visible.
+        """
         task_id = str(uuid.uuid4())
         
         task_info = TaskInfo(
@@ -45,48 +219,114 @@ class TaskManager:
             prompt=prompt
         )
         
-        self.task_metadata[task_id] = task_info
+        if self.persistence is not None:
+            self.persistence.task_created(task_info)
+        with self._lock:
+            self.task_metadata[task_id] = task_info
+            self._by_status[TaskStatus.PENDING].add(task_id)
+        self.store.save(task_info)
         return task_id
 
+    def restore(self, task_infos: Iterable[TaskInfo]) -> int:
+        """Load previously persisted tasks (oldest first) without writing them back."""
+        restored = 0
+        with self._lock:
+            for task_info in task_infos:
+                if task_info.task_id in self.task_metadata:
+                    continue
+                self.task_metadata[task_info.task_id] = task_info
+                self._by_status[task_info.status].add(task_info.task_id)
+                if task_info.status in TERMINAL_STATUSES:
+                    now = time.monotonic()
+                    self._finished[task_info.task_id] = now
+                    if task_info.result is not None:
+                        self._with_result[task_info.task_id] = now
+                restored += 1
+        self.prune()
+        return restored
+
     def get_task_info(self, task_id: str) -> Optional[TaskInfo]:
-        """Get task metadata."""
-        return self.task_metadata.get(task_id)
+        """Get task metadata, asking the shared store for tasks created by another process."""
+        task_info = self.task_metadata.get(task_id)
+        if task_info is None and self.store.shared:
+            data = self.store.load(task_id)
+            if data is not None:
+                task_info = self.apply_remote(data)
+        return task_info
 
     def update_task_progress(self, task_id: str, progress: float) -> None:
         """Update task progress."""
         if task_id in self.task_metadata:
             self.task_metadata[task_id].progress = progress
+            self._publish(task_id)
+            if self.persistence is not None:
+                self.persistence.task_progressed(self.task_metadata[task_id])
+    
+    def update_task_preview(self, task_id: str, preview: str, progress: float) -> None:
+        """Update the live latent preview taken at the given progress."""
+        if task_id in self.task_metadata:
+            self.task_metadata[task_id].preview = preview
+            self.task_metadata[task_id].preview_progress = progress
+            self._publish(task_id)
     
     def update_task_status(self, task_id: str, status: TaskStatus) -> None:
       """Update task status."""
       if task_id in self.task_metadata:
-          self.task_metadata[task_id].status = status
+          self._set_status(self.task_metadata[task_id], status)
           if status == TaskStatus.PROCESSING and not self.task_metadata[task_id].started_at:
               self.task_metadata[task_id].started_at = datetime.now().isoformat()
-          elif status in [TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.ERROR]:
+          elif status in TERMINAL_STATUSES:
               self.task_metadata[task_id].completed_at = datetime.now().isoformat()
+          self._changed(task_id)
           print(f"🔄 Status updated: {task_id} -> {status}")
+          if status in TERMINAL_STATUSES:
+              self.prune()
 
-    def mark_task_completed(self, task_id: str, result: Dict) -> None:
+    def reset_task(self, task_id: str) -> None:
+        """Return an interrupted task to PENDING with no progress, ready to be queued again."""
+        if task_id in self.task_metadata:
+            task_info = self.task_metadata[task_id]
+            self._set_status(task_info, TaskStatus.PENDING)
+            task_info.progress = 0.0
+            task_info.started_at = None
+            task_info.preview = None
+            task_info.preview_progress = None
+            self._changed(task_id)
+
+    def mark_task_completed(self, task_id: str, result: Dict, cache_hit: bool = False) -> None:
         """Mark task as completed with result."""
         if task_id in self.task_metadata:
-            self.task_metadata[task_id].status = TaskStatus.COMPLETED
+            self._set_status(self.task_metadata[task_id], TaskStatus.COMPLETED)
             self.task_metadata[task_id].completed_at = datetime.now().isoformat()
             self.task_metadata[task_id].result = result
             self.task_metadata[task_id].progress = 100.0
+            self.task_metadata[task_id].cache_hit = cache_hit
+            self._changed(task_id)
+            self.prune()
+
+    def attach_result_url(self, task_id: str, raw_url: str) -> None:
+        """Record where the stored image of a completed task can be fetched once its inline copy is dropped."""
+        task_info = self.task_metadata.get(task_id)
+        if task_info is not None and task_info.result is not None:
+            task_info.result = {**task_info.result, "raw_url": raw_url}
+            self.store.save(task_info)
 
     def mark_task_cancelled(self, task_id: str) -> None:
         """Mark task as cancelled."""
         if task_id in self.task_metadata:
-            self.task_metadata[task_id].status = TaskStatus.CANCELLED
+            self._set_status(self.task_metadata[task_id], TaskStatus.CANCELLED)
             self.task_metadata[task_id].completed_at = datetime.now().isoformat()
+            self._changed(task_id)
+            self.prune()
 
     def mark_task_error(self, task_id: str, error: str) -> None:
         """Mark task as error."""
         if task_id in self.task_metadata:
-            self.task_metadata[task_id].status = TaskStatus.ERROR
+            self._set_status(self.task_metadata[task_id], TaskStatus.ERROR)
             self.task_metadata[task_id].completed_at = datetime.now().isoformat()
             self.task_metadata[task_id].error = error
+            self._changed(task_id)
+            self.prune()
 
     def cancel_task(self, task_id: str) -> bool:
         """Cancel a specific task if it's pending or processing."""
@@ -98,7 +338,7 @@ class TaskManager:
             print(f"❌ Task {task_id} not found in metadata")
             return False
         
-        if task_info.status not in [TaskStatus.PENDING, TaskStatus.PROCESSING]:
+        if task_info.status not in ONGOING_STATUSES:
             print(f"⚠️  Task {task_id} is already {task_info.status}, cannot cancel")
             return False
         
@@ -114,11 +354,10 @@ class TaskManager:
         total_cancelled = 0
         
         print(f"   Found {len(self.task_metadata)} tasks in metadata")    
-        for task_id, task_info in list(self.task_metadata.items()):
-            if task_info.status in [TaskStatus.PENDING, TaskStatus.PROCESSING]:
-                print(f"   Marking task {task_id} as cancelled")
-                self.mark_task_cancelled(task_id)
-                total_cancelled += 1
+        for task_id in self._ids_with_status(ONGOING_STATUSES):
+            print(f"   Marking task {task_id} as cancelled")
+            self.mark_task_cancelled(task_id)
+            total_cancelled += 1
         
         result = {
             "total_cancelled": total_cancelled
@@ -131,18 +370,23 @@ class TaskManager:
         """Delete all tasks from the manager and return counts."""
         print("🗑️  Starting delete_all operation...")
         
-        total_tasks = len(self.task_metadata)
-        completed_tasks = 0
-        ongoing_tasks = 0
-        
-        for task_info in self.task_metadata.values():
-            if task_info.status in [TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.ERROR]:
-                completed_tasks += 1
-            else:
-                ongoing_tasks += 1
-        
-        self.task_metadata.clear()
-        self.task_metadata = {}  
+        with self._lock:
+            total_tasks = len(self.task_metadata)
+            completed_tasks = sum(len(self._by_status[status]) for status in TERMINAL_STATUSES)
+            ongoing_tasks = total_tasks - completed_tasks
+            
+            deleted_ids = list(self.task_metadata)
+            ongoing_ids = [task_id for status in ONGOING_STATUSES for task_id in self._by_status[status]]
+            self.task_metadata.clear()
+            self.task_metadata = {}  
+            for task_ids in self._by_status.values():
+                task_ids.clear()
+            self._finished.clear()
+            self._with_result.clear()
+        for task_id in deleted_ids:
+            self._publish(task_id)
+        for task_id in ongoing_ids:
+            self.forget_task(task_id)
         
         result = {
             "total_deleted": total_tasks,
@@ -153,6 +397,11 @@ class TaskManager:
         print(f"✅ delete_all completed: {result}")
         return result
 
+    def forget_task(self, task_id: str) -> None:
+        """Record that a deleted task will not run; its persisted row would otherwise be requeued on restart."""
+        if self.persistence is not None:
+            self.persistence.task_deleted(task_id)
+
     def _find_task_by_id(self, task_id: str) -> Optional[asyncio.Task]:
         """Find async task by ID."""
         for task in self.task_metadata:
@@ -160,20 +409,37 @@ class TaskManager:
                 return task
         return None
 
-    def list_all_tasks(self) -> Dict[str, Any]:
+    def _ids_with_status(self, statuses: Iterable[TaskStatus]) -> list:
+        with self._lock:
+            return [task_id for status in statuses for task_id in self._by_status[status]]
+
+    def iter_tasks(self, statuses: Optional[Iterable[TaskStatus]] = None) -> Iterator[TaskInfo]:
+        """Iterate over task records (optionally only some statuses) without copying them."""
+        task_ids = list(self.task_metadata) if statuses is None else self._ids_with_status(statuses)
+        for task_id in task_ids:
+            task_info = self.task_metadata.get(task_id)
+            if task_info is not None:
+                yield task_info
+
+    def count_by_status(self) -> Dict[str, int]:
+        """Number of tasks per status, straight from the indexes."""
+        with self._lock:
+            return {status.value: len(task_ids) for status, task_ids in self._by_status.items()}
+
+    def list_all_tasks(self, include_result: bool = True) -> Dict[str, Any]:
         """List all tasks with their metadata."""
-        print(f"*** CALLING ALL TASKS ***")
-        return {task_id: asdict(info) for task_id, info in self.task_metadata.items()}
+        return {task_info.task_id: task_info.to_dict(include_result) for task_info in self.iter_tasks()}
 
     def list_ongoing_tasks(self) -> Dict[str, Any]:
         """List only ongoing tasks."""
-        ongoing = {}
-        for task_id, info in self.task_metadata.items():
-            if info.status in [TaskStatus.PENDING, TaskStatus.PROCESSING]:
-                ongoing[task_id] = asdict(info)
-        return ongoing
+        return {task_info.task_id: task_info.to_dict() for task_info in self.iter_tasks(ONGOING_STATUSES)}
+
+    @property
+    def total(self) -> int:
+        """Return number of tasks held."""
+        return len(self.task_metadata)
 
     @property
     def count(self) -> int:
         """Return number of ongoing tasks."""
-        return len(self.list_ongoing_tasks())
\ No newline at end of file
+        return sum(len(self._by_status[status]) for status in ONGOING_STATUSES)
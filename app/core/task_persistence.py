@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from sqlalchemy import or_
+from sqlalchemy.orm import Session
+from app.config import DB_WRITE_BLOCK_MS, TASK_PROGRESS_PERSIST_SECONDS, TASK_RETENTION_MAX, TASK_RETENTION_SECONDS
+from app.core.db_writer import DatabaseWriter, WriterBacklogged, db_writer
+from app.core.task_manager import ONGOING_STATUSES, TERMINAL_STATUSES, TaskInfo, TaskStatus
+from app.models.db_models import Image, Task
+
+def _to_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+def _to_isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def task_row_values(task_info: TaskInfo) -> Dict[str, Any]:
+    """Column values of the `tasks` row mirroring a task."""
+    return {
+        "status": TaskStatus(task_info.status).value,
+        "progress": int(round(task_info.progress or 0)),
+        "prompt": task_info.prompt,
+        "request": json.dumps(task_info.request, default=str) if task_info.request is not None else None,
+        "error": task_info.error,
+        "created_at": _to_datetime(task_info.created_at),
+        "started_at": _to_datetime(task_info.started_at),
+        "completed_at": _to_datetime(task_info.completed_at)
+    }
+
+class TaskPersistence:
+    """Mirrors TaskManager changes into the `tasks` table through the write-behind writer.
+
+    Status changes are written as they happen. Progress is written at most every
+    `progress_interval` seconds per task; whatever was skipped is carried by the
+    next write, at the latest the one for the final status.
+    """
+
+    def __init__(self, writer: DatabaseWriter = db_writer, progress_interval: float = TASK_PROGRESS_PERSIST_SECONDS):
+        self.writer = writer
+        self.progress_interval = progress_interval
+        self._last_write: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def task_created(self, task_info: TaskInfo) -> None:
+        """Queue the row insert every later write of the task depends on; raises WriterBacklogged if it cannot."""
+        values = task_row_values(task_info)
+        values["task_id"] = task_info.task_id
+        if not self.writer.submit(lambda db: db.add(Task(**values)), block_seconds=DB_WRITE_BLOCK_MS / 1000):
+            raise WriterBacklogged(f"Database writes are backlogged ({self.writer.pending_count} pending)")
+        self._mark_written(task_info)
+
+    def task_changed(self, task_info: TaskInfo) -> None:
+        self._mark_written(task_info)
+        self._submit_update(task_info.task_id, task_row_values(task_info))
+
+    def task_progressed(self, task_info: TaskInfo) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_write.get(task_info.task_id, 0.0) < self.progress_interval:
+                return
+            self._last_write[task_info.task_id] = now
+        self._submit_update(task_info.task_id, {"progress": int(round(task_info.progress or 0))})
+
+    def task_deleted(self, task_id: str) -> None:
+        """Close the row of a task removed before it finished, so a restart does not requeue it."""
+        with self._lock:
+            self._last_write.pop(task_id, None)
+        ongoing = [status.value for status in ONGOING_STATUSES]
+        values = {"status": TaskStatus.CANCELLED.value, "completed_at": datetime.now()}
+        self.writer.submit(
+            lambda db: db.query(Task)
+            .filter(Task.task_id == task_id, Task.status.in_(ongoing))
+            .update(values, synchronize_session=False)
+        )
+
+    def _mark_written(self, task_info: TaskInfo) -> None:
+        with self._lock:
+            if task_info.status in TERMINAL_STATUSES:
+                self._last_write.pop(task_info.task_id, None)
+            else:
+                self._last_write[task_info.task_id] = time.monotonic()
+
+    def _submit_update(self, task_id: str, values: Dict[str, Any]) -> None:
+        self.writer.submit(
+            lambda db: db.query(Task).filter(Task.task_id == task_id).update(values, synchronize_session=False)
+        )
+
+def load_tasks(
+    db: Session,
+    max_finished: int = TASK_RETENTION_MAX,
+    max_age_seconds: float = TASK_RETENTION_SECONDS
+) -> List[TaskInfo]:
+    """Rebuild task records from the database: every unfinished task plus the most recent finished ones.
+
+    Completed tasks get a result pointing at their stored image instead of an inline copy.
+    """
+    ongoing = [status.value for status in ONGOING_STATUSES]
+    finished_since = datetime.now() - timedelta(seconds=max_age_seconds)
+
+    rows = (
+        db.query(Task, Image.id, Image.mime_type, Image.size_bytes)
+        .outerjoin(Image, Image.task_id == Task.task_id)
+        .filter(Task.status.in_(ongoing))
+        .all()
+    )
+    rows += (
+        db.query(Task, Image.id, Image.mime_type, Image.size_bytes)
+        .outerjoin(Image, Image.task_id == Task.task_id)
+        .filter(~Task.status.in_(ongoing))
+        .filter(or_(Task.completed_at >= finished_since, Task.completed_at.is_(None) & (Task.created_at >= finished_since)))
+        .order_by(Task.id.desc())
+        .limit(max_finished)
+        .all()
+    )
+
+    task_infos = []
+    for task, image_id, mime_type, size_bytes in rows:
+        try:
+            status = TaskStatus(task.status)
+        except ValueError:
+            print(f"⚠️  Skipping task {task.task_id} with unknown status '{task.status}'")
+            continue
+
+        result = None
+        if status == TaskStatus.COMPLETED and image_id is not None:
+            result = {
+                "task_id": task.task_id,
+                "prompt": task.prompt or "",
+                "raw_url": f"/images/{image_id}/raw",
+                "mime_type": mime_type,
+                "size_bytes": size_bytes
+            }
+
+        task_infos.append(TaskInfo(
+            task_id=task.task_id,
+            status=status,
+            progress=float(task.progress or 0),
+            created_at=_to_isoformat(task.created_at) or datetime.now().isoformat(),
+            started_at=_to_isoformat(task.started_at),
+            completed_at=_to_isoformat(task.completed_at),
+            request=json.loads(task.request) if task.request else None,
+            result=result,
+            error=task.error,
+            prompt=task.prompt
+        ))
+
+    # oldest first, so retention bookkeeping sees finished tasks in completion order
+    task_infos.sort(key=lambda task_info: task_info.completed_at or task_info.created_at)
+    return task_infos
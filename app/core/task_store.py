@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.config import TASK_STORE, TASK_STORE_PATH, TASK_STORE_POLL_MS
+
+TERMINAL_STATUS_VALUES = ("completed", "cancelled", "error")
+HEARTBEAT_SECONDS = 0.5
+HEARTBEAT_TIMEOUT_SECONDS = 3.0  # a process silent for this long is considered gone
+
+class TaskStore:
+    """Where task state is shared between API processes.
+
+    TaskManager writes every change of a task through `save`. A shared store also
+    feeds changes made by other processes back through `watch`, so /status,
+    /generate-stream and /cancel-generation answer the same on every worker.
+    """
+
+    shared = False
+
+    def save(self, task_info) -> None:
+        pass
+
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def claim(self, task_id: str) -> bool:
+        """Take over a task left behind by a previous process; False if a live process owns it."""
+        return True
+
+    def watch(self, apply: Callable[[Dict[str, Any]], None]) -> None:
+        """Start calling `apply(task_dict)` for changes made by other processes."""
+        pass
+
+    def prune(self, max_age_seconds: float) -> int:
+        return 0
+
+    def close(self) -> None:
+        pass
+
+class InMemoryTaskStore(TaskStore):
+    """Single-process mode: the TaskManager dict is the only copy."""
+
+def shared_payload(task_info) -> Dict[str, Any]:
+    """What other processes get of a task: no live preview, and the result without its inline image.
+
+    The image stays reachable through the result's raw_url once it is stored.
+    """
+    data = task_info.to_dict(include_result=False)
+    if task_info.result is not None:
+        data["result"] = {key: value for key, value in task_info.result.items() if key != "image_url"}
+    return data
+
+class SQLiteTaskStore(TaskStore):
+    """Task state in a SQLite file shared by all worker processes on the host.
+
+    Each write bumps a global version; a poller thread picks up rows written by
+    other processes since the last version it saw. A finished task cannot be put
+    back into an ongoing state by a late write, so a cancellation made on one
+    worker wins over progress reported by the worker running the task.
+    Progress-only changes are written at most once per poll interval per task,
+    since other processes would not see them any sooner.
+    """
+
+    shared = True
+
+    def __init__(self, path: str = TASK_STORE_PATH, poll_ms: int = TASK_STORE_POLL_MS):
+        self.path = path
+        self.poll_interval = poll_ms / 1000
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._last_heartbeat = 0.0
+        self._saved: Dict[str, Tuple[str, float]] = {}  # task_id -> (status, monotonic time) of its last write
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS task_state (
+                task_id TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                origin TEXT NOT NULL,
+                status TEXT NOT NULL,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_task_state_version ON task_state (version)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS task_store_origins (origin TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+        self._heartbeat()
+        print(f"✅ Shared task store at {path} (origin {self.origin})")
+
+    def save(self, task_info) -> None:
+        status = getattr(task_info.status, "value", task_info.status)
+        now = time.monotonic()
+        with self._lock:
+            last = self._saved.get(task_info.task_id)
+            if status in TERMINAL_STATUS_VALUES:
+                self._saved.pop(task_info.task_id, None)
+            elif last is not None and last[0] == status and now - last[1] < self.poll_interval:
+                return  # carried by the next write of this task, at the latest the final one
+            else:
+                self._saved[task_info.task_id] = (status, now)
+
+        data = json.dumps(shared_payload(task_info), default=str)
+        terminal = ",".join(f"'{value}'" for value in TERMINAL_STATUS_VALUES)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                version = self._conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM task_state").fetchone()[0]
+                self._conn.execute(f"""
+                    INSERT INTO task_state (task_id, version, origin, status, data, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(task_id) DO UPDATE SET
+                        version = excluded.version, origin = excluded.origin, status = excluded.status,
+                        data = excluded.data, updated_at = excluded.updated_at
+                    WHERE task_state.status NOT IN ({terminal}) OR excluded.status IN ({terminal})
+                """, (task_info.task_id, version, self.origin, status, data, time.time()))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM task_state WHERE task_id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def claim(self, task_id: str) -> bool:
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute("""
+                UPDATE task_state SET origin = ?, updated_at = ?
+                WHERE task_id = ? AND (origin = ? OR origin NOT IN (
+                    SELECT origin FROM task_store_origins WHERE seen_at > ?
+                ))
+            """, (self.origin, now, task_id, self.origin, now - HEARTBEAT_TIMEOUT_SECONDS))
+            if cursor.rowcount:
+                return True
+            # unknown to the store yet: the first process to insert a placeholder owns it
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO task_state (task_id, version, origin, status, data, updated_at) "
+                "VALUES (?, 0, ?, 'claimed', 'null', ?)",
+                (task_id, self.origin, now)
+            )
+            return cursor.rowcount == 1
+
+    def watch(self, apply: Callable[[Dict[str, Any]], None]) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._poll, args=(apply,), name="task-store-poller", daemon=True)
+        self._thread.start()
+
+    def _heartbeat(self) -> None:
+        now = time.time()
+        if now - self._last_heartbeat < HEARTBEAT_SECONDS:
+            return
+        self._last_heartbeat = now
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO task_store_origins (origin, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(origin) DO UPDATE SET seen_at = excluded.seen_at",
+                (self.origin, now)
+            )
+
+    def _poll(self, apply: Callable[[Dict[str, Any]], None]) -> None:
+        # earlier changes are read on demand through load, or from the database on restore
+        with self._lock:
+            seen_version = self._conn.execute("SELECT COALESCE(MAX(version), 0) FROM task_state").fetchone()[0]
+        while not self._stopped.wait(self.poll_interval):
+            try:
+                self._heartbeat()
+                with self._lock:
+                    rows = self._conn.execute(
+                        "SELECT version, origin, data FROM task_state WHERE version > ? ORDER BY version",
+                        (seen_version,)
+                    ).fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️  Task store poll failed: {e}")
+                continue
+
+            for version, origin, data in rows:
+                seen_version = version
+                if origin == self.origin:
+                    continue
+                try:
+                    apply(json.loads(data))
+                except Exception as e:
+                    print(f"⚠️  Could not apply shared task state: {e}")
+
+    def prune(self, max_age_seconds: float) -> int:
+        terminal = ",".join(f"'{value}'" for value in TERMINAL_STATUS_VALUES)
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            cursor = self._conn.execute(
+                f"DELETE FROM task_state WHERE status IN ({terminal}) AND updated_at < ?", (cutoff,)
+            )
+            self._conn.execute("DELETE FROM task_store_origins WHERE seen_at < ?", (cutoff,))
+            # tasks removed before finishing never get the terminal write that forgets them
+            stale = time.monotonic() - max_age_seconds
+            self._saved = {task_id: saved for task_id, saved in self._saved.items() if saved[1] >= stale}
+        return cursor.rowcount
+
+    def close(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.poll_interval * 5)
+            self._thread = None
+        with self._lock:
+            self._conn.execute("DELETE FROM task_store_origins WHERE origin = ?", (self.origin,))
+            self._conn.close()
+
+def create_task_store(kind: str = TASK_STORE) -> TaskStore:
+    if kind == "memory":
+        return InMemoryTaskStore()
+    if kind == "sqlite":
+        return SQLiteTaskStore()
+    raise ValueError(f"Unknown TASK_STORE '{kind}', expected 'memory' or 'sqlite'")
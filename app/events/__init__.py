@@ -1,7 +1,7 @@
-from .startup import start_up
-from .generate_stream import create_sse_event
+from .startup import restore_tasks, start_up
+from .generate_stream import create_sse_event, task_event_data
 from .cleanup import midnight_cleanup, db_weekly_cleanup
-from .db_events import save_image_to_db, delete_image_from_db, save_task_to_db
+from .db_events import save_image_to_db, delete_image_from_db
 
-__all__ = ['db_weekly_cleanup','start_up', 'create_sse_event', 'midnight_cleanup', 'save_image_to_db', 'delete_image_from_db', 'save_task_to_db']
+__all__ = ['db_weekly_cleanup','start_up', 'restore_tasks', 'create_sse_event', 'task_event_data', 'midnight_cleanup', 'save_image_to_db', 'delete_image_from_db']
 
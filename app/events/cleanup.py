@@ -1,7 +1,8 @@
 from fastapi import FastAPI
 from sqlalchemy import delete
-from app.core import model_loader
+from app.core.image_store import image_store
 from app.models.db_models import Image, Task
+from app.utils.count_cache import image_count_cache
 from app.utils.database import get_session
 
 def delete_tasks_and_images_from_db():
@@ -13,6 +14,8 @@ def delete_tasks_and_images_from_db():
         result_images = db_session.execute(stmt_images)
         db_session.commit()
         print(f"🗑️  Deleted {result_images.rowcount} rows from images table")
+        image_store.clear()
+        image_count_cache.invalidate()
         
         stmt_tasks = delete(Task)
         result_tasks = db_session.execute(stmt_tasks)
@@ -30,16 +33,16 @@ def delete_tasks_and_images_from_db():
 
 
 async def midnight_cleanup(app: FastAPI):
-    """Scheduled function to delete all tasks every midnight"""
+    """Scheduled function to apply the task retention policy every midnight.
 
-    task_manager = app.state.task_manager
-    cancel_result = task_manager.cancel_all()
-    print(f"📊 Cancellation result: {cancel_result}")
-    
-    delete_result = task_manager.delete_all()
-    print(f"📊 Deletion result: {delete_result}")
+    Queued and running tasks are left alone, and finished tasks that are still
+    being streamed are kept until their subscribers leave.
+    """
 
-    model_loader.cleanup()
+    task_manager = app.state.task_manager
+    prune_result = task_manager.prune()
+    prune_result["shared_states_removed"] = task_manager.store.prune(task_manager.retention_seconds)
+    print(f"📊 Retention result: {prune_result}")
 
 
 def db_weekly_cleanup(app: FastAPI):
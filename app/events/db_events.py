@@ -1,39 +1,39 @@
+from app.core.db_writer import db_writer
+from app.core.image_store import image_store
 from app.models.image_models import GenerationResult
+from app.utils.image_processing import EncodedImage, create_thumbnail_from_bytes
+from typing import Callable, Optional
+from app.utils.count_cache import image_count_cache
 from app.utils.database import get_db
-from app.models.db_models import Image, Task
+from app.models.db_models import Image
 from sqlalchemy.orm import Session
 
-def save_task_to_db(task_info, db: Session):
-    try:
-        task = Task(
-            task_id=task_info.task_id,
-            status=task_info.status,
-            progress=task_info.progress
-        )
-        db.add(task)
-        db.commit()
-        db.refresh(task)
-        print(f"✅ Task {task_info.task_id} saved to db")
-        return task
-    except Exception as e:
-        db.rollback()
-        print(f"Error saving task: {e}")
+def save_image_to_db(
+    result: GenerationResult,
+    data: bytes,
+    mime_type: str,
+    thumbnail: Optional[EncodedImage] = None,
+    on_saved: Optional[Callable[[int], None]] = None
+) -> None:
+    """Queue the storage of an image and its row; `on_saved(image_id)` runs once it is committed."""
+    task_id, prompt = result["task_id"], result["prompt"]
 
-def save_image_to_db(result: GenerationResult, db: Session):
-    try:
-        image = Image(
-            task_id=result["task_id"],   
-            image_data=result["image_url"], 
-            prompt=result["prompt"]        
-        )
+    def write(db: Session) -> int:
+        image = Image(task_id=task_id, prompt=prompt)
+        image_store.attach(image, data, mime_type)
+        image_thumbnail = thumbnail or create_thumbnail_from_bytes(data)
+        image_store.attach_thumbnail(image, image_thumbnail.data, image_thumbnail.mime_type)
         db.add(image)
-        db.commit()
-        db.refresh(image)
-        print(f"✅ Image saved for task {result['task_id']}")
-        return image
-    except Exception as e:
-        db.rollback()
-        print(f"Error saving image: {e}")
+        db.flush()
+        return image.id
+
+    def saved(image_id: int) -> None:
+        image_count_cache.adjust(1)
+        print(f"✅ Image saved for task {task_id}")
+        if on_saved is not None:
+            on_saved(image_id)
+
+    db_writer.submit(write, saved)
 
 def delete_image_from_db(task_id: str):
     db_gen = get_db()
@@ -42,7 +42,14 @@ def delete_image_from_db(task_id: str):
         image = db.query(Image).filter(Image.task_id == task_id).first()
         
         if image:
+            storage_key, thumb_key = image.storage_key, image.thumb_key
             db.delete(image)
+            db.commit()
+            image_count_cache.adjust(-1)
+            if storage_key and not db.query(Image).filter(Image.storage_key == storage_key).first():
+                image_store.remove(storage_key)
+            if thumb_key and not db.query(Image).filter(Image.thumb_key == thumb_key).first():
+                image_store.remove(thumb_key)
             print(f"✅ Image with task_id {task_id} deleted successfully")
             return True
         else:
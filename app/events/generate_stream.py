@@ -1,6 +1,29 @@
 import json
+from app.core.task_manager import TaskInfo, TaskStatus
 
 def create_sse_event(data: dict) -> str:
     """Create a properly formatted SSE event"""
     json_data = json.dumps(data)
-    return f"data: {json_data}\n\n"
\ No newline at end of file
+    return f"data: {json_data}\n\n"
+
+def task_event_data(task_info: TaskInfo) -> dict:
+    """Progress payload for a task, shared by the stream endpoints"""
+    data = {
+        'task_id': task_info.task_id,
+        'status': task_info.status,
+        'progress': task_info.progress,
+        'message': f'Progress: {task_info.progress}%'
+    }
+
+    # a preview is only sent with the step that produced it
+    if (task_info.status == TaskStatus.PROCESSING and task_info.preview and
+        task_info.preview_progress == task_info.progress):
+        data['preview'] = task_info.preview
+
+    if task_info.status == TaskStatus.COMPLETED and task_info.result:
+        data['result'] = task_info.result
+
+    if task_info.status == TaskStatus.ERROR and task_info.error:
+        data['error'] = task_info.error
+
+    return data
\ No newline at end of file
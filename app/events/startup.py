@@ -1,5 +1,10 @@
-from app.config import DEVICE
-from app.utils.database import Base, create_database_if_not_exists, get_engine
+from fastapi import FastAPI
+from pydantic import ValidationError
+from app.config import DEVICE, TASK_RESTORE_POLICY
+from app.core.task_manager import ONGOING_STATUSES, TaskManager
+from app.core.task_persistence import load_tasks
+from app.models import GenerateRequest
+from app.utils.database import Base, create_database_if_not_exists, get_engine, get_session
 
 async def start_up():
     print(f"💡 Tips: {'GPU' if DEVICE == 'cuda' else 'CPU'} optimized settings applied")
@@ -10,3 +15,47 @@ async def start_up():
         print("✅ Database tables initialized successfully!")
     except Exception as e:
         print(f"❌ Failed to initialize database: {e}")
+
+
+def restore_tasks(app: FastAPI) -> None:
+    """Rebuild the task manager from the database after a restart.
+
+    Tasks that were pending or running when the previous process stopped are
+    queued again (TASK_RESTORE_POLICY="requeue") or marked as failed.
+    """
+    task_manager: TaskManager = app.state.task_manager
+    db = None
+    try:
+        db = get_session()
+        task_infos = load_tasks(db)
+    except Exception as e:
+        print(f"❌ Failed to restore tasks from the database: {e}")
+        return
+    finally:
+        if db:
+            db.close()
+
+    restored = task_manager.restore(task_infos)
+    requeued = failed = 0
+    for task_info in task_infos:
+        if task_info.status not in ONGOING_STATUSES:
+            continue
+        if not task_manager.store.claim(task_info.task_id):
+            continue  # another API worker already took it over
+        generate_request = None
+        if TASK_RESTORE_POLICY == "requeue" and task_info.request:
+            try:
+                generate_request = GenerateRequest(**task_info.request)
+            except ValidationError as e:
+                print(f"⚠️  Task {task_info.task_id} has an unusable stored request: {e}")
+
+        if generate_request is None:
+            task_manager.mark_task_error(task_info.task_id, "Interrupted by a server restart")
+            failed += 1
+            continue
+
+        task_manager.reset_task(task_info.task_id)
+        app.state.generation_queue.submit(task_info.task_id, generate_request, priority=generate_request.priority)
+        requeued += 1
+
+    print(f"♻️  Restored {restored} tasks from the database ({requeued} requeued, {failed} marked failed)")
@@ -2,9 +2,9 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core import shutdown_manager
-from app.utils import lifespan
+from app.utils.lifespan import lifespan
 from .config import DEVICE, EXECUTOR
-from .routes import generate_image, cancel_generation, get_generation_stream, get_images, get_tasks, get_generation_status, delete_tasks
+from .routes import generate_image, cancel_generation, get_generation_stream, get_images, get_tasks, get_generation_status, delete_tasks, task_updates_socket, health_checks, get_metrics, get_samplers
 
 print(f"\n🚀 Using device: {DEVICE.upper()}")
 
@@ -28,11 +28,15 @@ app.state.executor = EXECUTOR
 
 app.include_router(generate_image)
 app.include_router(get_generation_stream)
+app.include_router(task_updates_socket)
 app.include_router(get_generation_status)
 app.include_router(cancel_generation)
 app.include_router(delete_tasks)
 app.include_router(get_tasks)
 app.include_router(get_images)  
+app.include_router(health_checks)
+app.include_router(get_metrics)
+app.include_router(get_samplers)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
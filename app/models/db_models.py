@@ -1,29 +1,47 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, LargeBinary, Index
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.sql import func
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
 class Task(Base):
     __tablename__ = "tasks"
-    __table_args__ = {'schema': 'dbo'} 
+    __table_args__ = (
+        Index('ix_tasks_status', 'status'),  # restoring ongoing tasks on startup
+        {'schema': 'dbo'}
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(String(36), unique=True, index=True)
     status = Column(String(20), default="pending")
     progress = Column(Integer, default=0)
+    prompt = Column(Text, nullable=True)
+    request = Column(Text, nullable=True)  # GenerateRequest as JSON, used to requeue after a restart
+    error = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    completed_at = Column(DateTime(timezone=True), nullable=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
     image = relationship("Image", back_populates="task", uselist=False)
 
 class Image(Base):
     __tablename__ = "images"
-    __table_args__ = {'schema': 'dbo'}  
+    __table_args__ = (
+        Index('ix_images_created_at_id', 'created_at', 'id'),  # keyset pagination
+        {'schema': 'dbo'}
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     task_id = Column(String(36), ForeignKey('dbo.tasks.task_id'), unique=True, index=True) 
-    image_data = Column(Text, nullable=True)
+    image_data = Column(Text, nullable=True)  # legacy base64 data URL
+    storage_key = Column(String(64), nullable=True, index=True)
+    size_bytes = Column(Integer, nullable=True)
+    mime_type = Column(String(32), nullable=True)
+    image_blob = deferred(Column(LargeBinary, nullable=True))  # only used by the database image store
+    thumb_key = Column(String(64), nullable=True)
+    thumb_mime_type = Column(String(32), nullable=True)
+    thumb_blob = deferred(Column(LargeBinary, nullable=True))
     prompt = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
@@ -1,23 +1,41 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, root_validator
 from typing import Optional
 from pydantic import BaseModel
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 from datetime import datetime
 
+# Names of app.core.samplers.SAMPLERS, GET /samplers lists them with their recommended steps
+SamplerName = Literal["default", "ddim", "euler", "euler_a", "dpmpp_2m", "dpmpp_2m_karras", "unipc"]
+
 class GenerateRequest(BaseModel):
     prompt: str
+    model: Optional[str] = None  # one of the configured MODELS, the default model when unset
     negative_prompt: Optional[str] = None
-    width: int = 512
-    height: int = 512
-    num_inference_steps: int = 50
+    width: int = Field(512, ge=64, le=1024, multiple_of=8)
+    height: int = Field(512, ge=64, le=1024, multiple_of=8)
+    num_inference_steps: Optional[int] = Field(None, ge=1, le=150)  # alias of steps, kept for older clients
     guidance_scale: float = 7.5
-    steps: int = 20
+    steps: int = Field(20, ge=1, le=150)
+    sampler: SamplerName = "default"  # scheduler used for this request, see GET /samplers for step counts
     seed: Optional[int] = None
+    priority: int = 0  # higher runs first
+    output_format: Literal["png", "webp", "jpeg"] = "png"
+    quality: Optional[int] = Field(None, ge=1, le=100)  # WebP/JPEG only
+    preview: bool = False  # stream low-resolution latent previews while generating
+    preview_interval: int = Field(5, ge=1)  # steps between previews
+
+    @root_validator(pre=True)
+    def _steps_alias(cls, values):
+        if values.get("num_inference_steps") is not None and values.get("steps") is None:
+            values["steps"] = values["num_inference_steps"]
+        return values
 
 class ImagesParams(BaseModel):
     page: int = 1
     limit: int = 12 
     task_id: Optional[str] = None
+    size: Literal["thumb", "full"] = "thumb"
+    cursor: Optional[str] = None  # next_cursor from the previous slice, takes precedence over page
 
 class CancelRequest(BaseModel):
     task_id: str
@@ -41,13 +59,19 @@ class GenerationStatus(BaseModel):
 
 class GenerationResult(BaseModel):
     task_id: str
-    image_url: str        
+    image_url: Optional[str] = None  # dropped from memory once the task ages out, see raw_url
     prompt: str
+    raw_url: Optional[str] = None
+    mime_type: Optional[str] = None
+    size_bytes: Optional[int] = None
+    encode_ms: Optional[float] = None
 
 class ImageResponse(BaseModel):
     id: int
     task_id: str
-    image_url: str
+    image_url: Optional[str] = None
+    raw_url: Optional[str] = None
+    thumb_url: Optional[str] = None
     prompt: str
     created_at: datetime
 
@@ -60,6 +84,7 @@ class ImageResponse(BaseModel):
 class ImagesSliceResponse(BaseModel):
     length: int
     slice: Optional[list[ImageResponse]] = None
+    next_cursor: Optional[str] = None
 
 class TaskResponse(BaseModel):
     id: int
@@ -88,6 +113,9 @@ class TaskStatusResponse(BaseModel):
     cancelled: bool
     result: Optional[GenerationResult]
     prompt: str
+    queue_position: Optional[int] = None
+    eta_seconds: Optional[float] = None
+    cache_hit: bool = False
 
     class Config:
         from_attributes = True
@@ -99,6 +127,10 @@ class GenerationResponse(BaseModel):
     status:str
     task_id:str
     message:str
+    queue_position: Optional[int] = None
+    cache_hit: bool = False
+    estimated_memory_mb: Optional[int] = None
+    estimated_cost: Optional[float] = None  # in 512x512 denoising steps
     created_at: datetime
 
     class Config:
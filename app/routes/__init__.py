@@ -6,5 +6,9 @@ from .images import router as get_images
 from .task_status import router as get_generation_status
 from .generate_stream import router as get_generation_stream
 from .cancel_generation import router as cancel_generation
+from .task_socket import router as task_updates_socket
+from .health import router as health_checks
+from .metrics import router as get_metrics
+from .samplers import router as get_samplers
 
-__all__ = ['get_images', 'cancel_generation', 'generate_image', 'task_status', 'get_tasks', 'get_generation_status', 'get_generation_stream', 'delete_tasks']
\ No newline at end of file
+__all__ = ['get_images', 'cancel_generation', 'generate_image', 'task_status', 'get_tasks', 'get_generation_status', 'get_generation_stream', 'delete_tasks', 'task_updates_socket', 'health_checks', 'get_metrics', 'get_samplers']
\ No newline at end of file
@@ -60,6 +60,8 @@ async def cancel_generation(request: Request, cancel_request: CancelRequest):
         )
 
     cancellation_successful = task_manager.cancel_task(task_id)
+    if cancellation_successful:
+        request.app.state.generation_queue.discard(task_id)
     
     if cancellation_successful:
         logging.info(f"Successfully cancelled task {task_id} - Prompt: {task_info.prompt}")
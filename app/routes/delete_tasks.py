@@ -10,15 +10,14 @@ async def delete_tasks(request: Request):
     """Endpoint to delete all tasks that are not processing"""
     
     task_manager: TaskManager = request.app.state.task_manager
-    ongoing_tasks = task_manager.list_all_tasks()
+    total_tasks = task_manager.total
 
     try:
-        if not ongoing_tasks or len(ongoing_tasks) == 0:
+        if total_tasks == 0:
             return JSONResponse({
                 "message": "No tasks found"
             })
         
-        total_tasks = len(ongoing_tasks)
         task_manager.delete_all()
         
         return JSONResponse({
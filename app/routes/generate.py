@@ -1,136 +1,257 @@
-from io import BytesIO
 from fastapi.responses import JSONResponse
 from datetime import datetime
-import torch
-import base64
-from fastapi import APIRouter, BackgroundTasks, Depends, Request
-from app.config import DEVICE
-from app.core.model_loader import model_loader
-from app.events.db_events import save_image_to_db, save_task_to_db
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Request
+from app.config import MODEL_QUEUE_WHILE_LOADING
+from app.core.model_loader import SERVING_STATES, ModelState, model_registry
+from app.core.pipeline_runner import GeneratedImage, run_generation, wants_preview
+from app.events.db_events import save_image_to_db
 from app.models import GenerateRequest
+from app.core.db_writer import WriterBacklogged, db_writer
+from app.core.generation_queue import GenerationQueue
+from app.core.job_estimate import estimate_job
+from app.core.result_cache import result_cache
 from app.core.task_manager import TaskManager, TaskStatus
 from app.models.image_models import GenerationResponse
-from app.utils.database import get_db
-from app.utils.image_processing import resize_image_base64
-from sqlalchemy.orm import Session
+from app.utils.image_processing import to_data_url
 
 router = APIRouter()
-pipe = model_loader.get_model()
 
-def generate_image_task(app, task_id: str, generate_request: GenerateRequest, db: Session = Depends(get_db)):
-    """Background task for image generation"""
+def batch_key(generate_request: GenerateRequest):
+    """Requests with the same key can share one batched pipeline call"""
+    return (
+        generate_request.model,
+        generate_request.sampler,
+        generate_request.steps,
+        generate_request.guidance_scale,
+        generate_request.width,
+        generate_request.height
+    )
+
+def model_unavailable_reason(model) -> Optional[str]:
+    """Why new generations cannot be accepted right now, or None when they can (queued while loading)"""
+    if model.state == ModelState.FAILED:
+        return f"Model failed to load: {model.error}"
+    if model.state not in SERVING_STATES and not MODEL_QUEUE_WHILE_LOADING:
+        return "Model is still loading"
+    return None
+
+def save_generated_image(task_manager: TaskManager, task_id: str, generate_request: GenerateRequest, generated: GeneratedImage) -> None:
+    """Complete the task with its encoded image and store the image"""
+    encoded = generated.image
+    print(f"🖼️ Task {task_id} encoded as {encoded.mime_type} ({len(encoded.data)} bytes) in {encoded.encode_ms}ms")
+
+    result = {
+        "task_id": task_id,
+        "image_url": to_data_url(encoded.data, encoded.mime_type),
+        "prompt": generate_request.prompt,
+        "mime_type": encoded.mime_type,
+        "size_bytes": len(encoded.data),
+        "encode_ms": encoded.encode_ms,
+    }
+    task_manager.mark_task_completed(task_id, result)
+    result_cache.put(result_cache.make_key(generate_request), encoded.data, encoded.mime_type)
+    save_image_to_db(
+        result, encoded.data, encoded.mime_type,
+        thumbnail=generated.thumbnail,
+        on_saved=lambda image_id: task_manager.attach_result_url(task_id, f"/images/{image_id}/raw")
+    )
+
+    print(f"✅ Task {task_id} completed, image queued for saving")
+
+def generate_image_task(app, jobs: List[Tuple[str, GenerateRequest]]) -> bool:
+    """Queue worker job running one batched pipeline call, returns True when the pipeline ran to completion.
+
+    The pipeline runs on this thread, or in a model worker process when the app has
+    a model worker pool (MODEL_WORKER_MODE="process"). Cancelling one task of the
+    batch only masks its slot: the remaining samples keep denoising and the
+    cancelled sample is dropped when the batch finishes.
+    """
     task_manager: TaskManager = app.state.task_manager
-    
-    try:
+
+    batch = []
+    for task_id, generate_request in jobs:
         current_info = task_manager.get_task_info(task_id)
-        if current_info and current_info.status != TaskStatus.PROCESSING:
-            task_manager.update_task_status(task_id, TaskStatus.PROCESSING)
-            print(f"🔄 Status corrected to PROCESSING for task {task_id}")
-        
-        generator = torch.Generator(DEVICE)
-        if generate_request.seed:
-            generator.manual_seed(generate_request.seed)
-
-        def callback(step: int, timestep: int, latents: torch.FloatTensor):
-            """Callback function to check for cancellation"""
-            current_info = task_manager.get_task_info(task_id)
-            if not current_info or current_info.status == TaskStatus.CANCELLED:
-                print(f"⏹️ Cancellation detected in callback for task {task_id}")
-                raise InterruptedError("Generation cancelled by user")
-            
-            progress = (step / generate_request.steps) * 100
-            task_manager.update_task_progress(task_id, round(progress, 2))
-            
-            if step % 10 == 0:
-                prompt = generate_request.prompt[:50] + "..." if len(generate_request.prompt) > 50 else generate_request.prompt
-                print(f"📊 Task {task_id} progress: {progress:.1f}% - '{prompt}'")
-
-        image = pipe(
-            prompt=generate_request.prompt,
-            num_inference_steps=generate_request.steps,
-            guidance_scale=generate_request.guidance_scale,
-            generator=generator,
-            callback=callback,
-            callback_steps=1
-        ).images[0]
-
-        buffered = BytesIO()
-        image.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-        resized_base64 = resize_image_base64(
-            base64_string=img_str, 
-            max_width=1024, 
-            max_height=1024
-        )
-
-        result = {
-            "task_id": task_id,
-            "image_url": resized_base64,
-            "prompt": generate_request.prompt,
-        }
-        task_manager.mark_task_completed(task_id, result)
-        db_gen = get_db()
-        db = next(db_gen)
-        try:
-            save_image_to_db(result, db)  
-        finally:
-            try:
-                next(db_gen)
-            except StopIteration:
-                pass
+        if not current_info or current_info.status != TaskStatus.PENDING:
+            status = current_info.status if current_info else "missing"
+            print(f"⏭️ Skipping task {task_id} picked from queue with status: {status}")
+            if not current_info:
+                task_manager.forget_task(task_id)
+            continue
+        task_manager.update_task_status(task_id, TaskStatus.PROCESSING)
+        batch.append((task_id, generate_request))
 
-        
-        print(f"✅ Task {task_id} completed & saved successfully")
+    if not batch:
+        return False
+
+    task_ids = [task_id for task_id, _ in batch]
+    generate_requests = [generate_request for _, generate_request in batch]
+    masked = set()
+
+    def is_live(index: int) -> bool:
+        task_id = task_ids[index]
+        if task_id in masked:
+            return False
+        current_info = task_manager.get_task_info(task_id)
+        if not current_info or current_info.status == TaskStatus.CANCELLED:
+            print(f"⏹️ Cancellation detected in callback for task {task_id}, masking its batch slot")
+            masked.add(task_id)
+            if not current_info:
+                task_manager.forget_task(task_id)
+            return False
+        return True
+
+    def want_preview(index: int, step: int) -> bool:
+        return wants_preview(generate_requests[index], step) and task_manager.event_bus.has_subscribers(task_ids[index])
+
+    def on_progress(step: int, progress: float, previews) -> None:
+        for index, task_id in enumerate(task_ids):
+            if task_id in masked:
+                continue
+            task_manager.update_task_progress(task_id, progress)
+            if index in previews:
+                task_manager.update_task_preview(task_id, previews[index], progress)
+
+        if step % 10 == 0:
+            print(f"📊 Batch {[task_id for task_id in task_ids if task_id not in masked]} progress: {progress:.1f}%")
+
+    try:
+        model_workers = getattr(app.state, "model_workers", None)
+        if model_workers is not None:
+            results = model_workers.run(generate_requests, is_live, on_progress)
+        else:
+            loader = model_registry.get(generate_requests[0].model)
+            with model_registry.use(loader.name, generate_requests[0].sampler) as pipe:
+                results = run_generation(pipe, generate_requests, is_live, on_progress, want_preview, loader.encoder_key)
+
+        for index, ((task_id, generate_request), generated) in enumerate(zip(batch, results)):
+            if generated is None or not is_live(index):
+                continue
+            try:
+                save_generated_image(task_manager, task_id, generate_request, generated)
+            except Exception as e:
+                print(f"❌ Error saving result for task {task_id}: {e}")
+                task_manager.mark_task_error(task_id, str(e))
+        return True
 
     except InterruptedError:
-        print(f"⏹️ Task {task_id} was cancelled during generation")
-        task_manager.mark_task_cancelled(task_id)
+        print(f"⏹️ Batch {task_ids} was cancelled during generation")
+        for task_id in task_ids:
+            task_manager.mark_task_cancelled(task_id)
     
     except Exception as e:
-        print(f"❌ Error in task {task_id}: {e}")
+        print(f"❌ Error in batch {task_ids}: {e}")
         import traceback
         traceback.print_exc()
-        task_manager.mark_task_error(task_id, str(e))
+        for task_id in task_ids:
+            if task_id not in masked:
+                task_manager.mark_task_error(task_id, str(e))
     
     finally:
-        final_info = task_manager.get_task_info(task_id)
-        if final_info:
-            print(f"🏁 Task {task_id} final status: {final_info.status}")
+        for task_id in task_ids:
+            final_info = task_manager.get_task_info(task_id)
+            if final_info:
+                print(f"🏁 Task {task_id} final status: {final_info.status}")
+
+    return False
 
 @router.post("/generate", response_model=GenerationResponse)
-async def generate_image(request: Request, generate_request: GenerateRequest, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Endpoint to start image generation using TaskManager only"""
+async def generate_image(request: Request, generate_request: GenerateRequest):
+    """Endpoint to queue image generation, the task stays PENDING until a worker slot frees up"""
     try:
         task_manager: TaskManager = request.app.state.task_manager
+        generation_queue: GenerationQueue = request.app.state.generation_queue
 
         print("\n" + "="*50)
         print("📨 RECEIVED GENERATION REQUEST:")
         print(f"Prompt: '{generate_request.prompt}'")
         print("="*50 + "\n")
 
-        task_id = task_manager.create_task(
-            request=generate_request.dict(),
-            prompt=generate_request.prompt
-        )
+        try:
+            generate_request.model = model_registry.resolve(generate_request.model)
+        except KeyError as e:
+            return JSONResponse(status_code=400, content={"status": "error", "message": e.args[0]})
+
+        estimate = estimate_job(generate_request)
+        if generation_queue.memory_budget_bytes and estimate.memory_bytes > generation_queue.memory_budget_bytes:
+            message = (
+                f"A {generate_request.width}x{generate_request.height} generation needs about {estimate.memory_mb}MB, "
+                f"more than the {generation_queue.memory_budget_bytes // (1024 * 1024)}MB budget; lower width or height"
+            )
+            print(f"⛔ Rejecting generation request: {message}")
+            return JSONResponse(status_code=413, content={"status": "rejected", "message": message})
+
+        if db_writer.backlogged:
+            message = f"Database writes are backlogged ({db_writer.pending_count} pending)"
+            print(f"⛔ Rejecting generation request: {message}")
+            return JSONResponse(
+                status_code=503,
+                content={"status": "unavailable", "message": message},
+                headers={"Retry-After": "5"}
+            )
+
+        cached = result_cache.get(result_cache.make_key(generate_request))
+        unavailable = None if cached is not None else model_unavailable_reason(request.app.state.model)
+        if unavailable:
+            print(f"⛔ Rejecting generation request: {unavailable}")
+            return JSONResponse(
+                status_code=503,
+                content={"status": "unavailable", "message": unavailable, "model": request.app.state.model.status()},
+                headers={"Retry-After": "10"}
+            )
+
+        try:
+            task_id = task_manager.create_task(
+                request=generate_request.dict(),
+                prompt=generate_request.prompt
+            )
+        except WriterBacklogged as e:
+            print(f"⛔ Rejecting generation request: {e}")
+            return JSONResponse(
+                status_code=503,
+                content={"status": "unavailable", "message": str(e)},
+                headers={"Retry-After": "5"}
+            )
         
         print(f"📝 Task created with ID: {task_id}")
         print(f"   Initial status: {task_manager.get_task_info(task_id).status}")
-        
-        background_tasks.add_task(generate_image_task, request.app, task_id, generate_request, request)
-        task_manager.update_task_status(task_id, TaskStatus.PROCESSING)
 
-        task_info = task_manager.get_task_info(task_id)
-        save_task_to_db(task_info, db)
+        if cached is not None:
+            result = {
+                "task_id": task_id,
+                "image_url": to_data_url(*cached),
+                "prompt": generate_request.prompt,
+                "mime_type": cached[1],
+                "size_bytes": len(cached[0]),
+            }
+            task_manager.mark_task_completed(task_id, result, cache_hit=True)
+            save_image_to_db(
+                result, *cached,
+                on_saved=lambda image_id: task_manager.attach_result_url(task_id, f"/images/{image_id}/raw")
+            )
+
+            print(f"⚡ Task {task_id} served from result cache")
+            return JSONResponse({
+                "status": "completed",
+                "task_id": task_id,
+                "message": "Generation served from result cache",
+                "cache_hit": True,
+                "created_at": datetime.now().isoformat()
+            })
+        
+        queue_position = generation_queue.submit(task_id, generate_request, priority=generate_request.priority)
         
-        print(f"✅ Task {task_id} started via TaskManager")
+        print(f"✅ Task {task_id} queued at position {queue_position}")
         print(f"   Status: {task_manager.get_task_info(task_id).status}")
         print(f"   Total ongoing tasks: {task_manager.count}")
         
         return JSONResponse({
             "status": "started",
             "task_id": task_id,
-            "message": "Generation started in background",
+            "message": f"Generation queued at position {queue_position}",
+            "queue_position": queue_position,
+            "estimated_memory_mb": estimate.memory_mb,
+            "estimated_cost": estimate.cost,
             "created_at": datetime.now().isoformat()
         })
         
@@ -1,14 +1,15 @@
 import asyncio
 from fastapi import APIRouter, Request
 from fastapi.responses import StreamingResponse
-from app.events.generate_stream import create_sse_event
+from app.config import SSE_KEEPALIVE_SECONDS
+from app.events.generate_stream import create_sse_event, task_event_data
 from app.core.task_manager import TaskManager, TaskStatus
 
 router = APIRouter()
 
 @router.get("/generate-stream/{task_id}")
 async def get_generation_stream(request: Request, task_id: str):
-    """SSE stream for generation progress (GET)"""
+    """SSE stream for generation progress (GET), pushed as soon as the task changes"""
 
     task_manager: TaskManager = request.app.state.task_manager
     task_info = task_manager.get_task_info(task_id)
@@ -25,11 +26,18 @@ async def get_generation_stream(request: Request, task_id: str):
     prompt = task_info.prompt or 'N/A'
     print(f"🔗 Client connected to stream for task {task_id} | prompt: {prompt}")  
     
-    stop_event = asyncio.Event()
+    event_bus = task_manager.event_bus
     
     async def event_stream():
+        channel = event_bus.subscribe(task_id)
+        seen_version = -1
         try:
-            while not stop_event.is_set() and not await request.is_disconnected():
+            while True:
+                if not await channel.wait_for_change(seen_version, timeout=SSE_KEEPALIVE_SECONDS):
+                    yield ": keepalive\n\n"
+                    continue
+                seen_version = channel.version
+
                 current_task_info = task_manager.get_task_info(task_id)
                 
                 if not current_task_info:
@@ -39,22 +47,7 @@ async def get_generation_stream(request: Request, task_id: str):
                     })
                     break
                 
-                sse_data = {
-                    'task_id': task_id,
-                    'status': current_task_info.status,
-                    'progress': current_task_info.progress,
-                    'message': f'Progress: {current_task_info.progress}%'
-                }
-                
-                if (current_task_info.status == TaskStatus.COMPLETED and 
-                    current_task_info.result):
-                    sse_data['result'] = current_task_info.result
-                
-                if (current_task_info.status == TaskStatus.ERROR and 
-                    current_task_info.error):
-                    sse_data['error'] = current_task_info.error
-                
-                yield create_sse_event(sse_data)
+                yield channel.snapshot(lambda: create_sse_event(task_event_data(current_task_info)))
                 
                 if current_task_info.status in [
                     TaskStatus.COMPLETED, 
@@ -64,8 +57,6 @@ async def get_generation_stream(request: Request, task_id: str):
                     print(f"📤 Stream ending for task {task_id} with status: {current_task_info.status}")
                     break
                 
-                await asyncio.sleep(0.5) 
-                
         except asyncio.CancelledError:
             print(f"📡 Stream connection cancelled for task {task_id}")
         except Exception as e:
@@ -75,7 +66,7 @@ async def get_generation_stream(request: Request, task_id: str):
                 'status': 'error'
             })
         finally:
-            stop_event.set()
+            event_bus.unsubscribe(task_id)
             print(f"🔌 Client disconnected from stream for task {task_id}")
     
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
\ No newline at end of file
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from app.core.model_loader import SERVING_STATES
+
+router = APIRouter()
+
+@router.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests, whatever the model is doing"""
+    return {"status": "ok"}
+
+@router.get("/readyz")
+async def readyz(request: Request):
+    """Readiness: 200 once the model is loaded (and warmed up), 503 while loading or after a failed load
+
+    An idle-unloaded model still counts as ready, it is reloaded by the next request.
+    """
+    model = getattr(request.app.state, "model", None)
+    if model is None:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+
+    model_status = model.status()
+    generation_queue = request.app.state.generation_queue
+    ready = model.state in SERVING_STATES
+    content = {
+        "status": "ready" if ready else model_status["state"],
+        "model": model_status,
+        "queue": {"pending": generation_queue.pending_count, "running": generation_queue.running_count}
+    }
+    return JSONResponse(status_code=200 if ready else 503, content=content)
@@ -1,43 +1,118 @@
-from fastapi import APIRouter, Depends, HTTPException
+import base64
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import FileResponse, Response
 from requests import Session
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import undefer
+from app.core.image_store import DatabaseImageStore, image_store, load_image_bytes, load_thumbnail_bytes
 from app.models.db_models import Image
 from app.models.image_models import ImagesParams, ImagesSliceResponse
+from app.utils.count_cache import image_count_cache
 from app.utils.database import get_db
+from app.utils.image_processing import to_data_url
 
 router = APIRouter()
 
+def encode_cursor(image: Image) -> str:
+    """Opaque keyset cursor pointing just after `image` in (created_at, id) descending order.
+
+    Only the id travels: the row's created_at is compared in the database, since a
+    timestamp round-tripped through Python loses precision (MSSQL) or format (SQLite).
+    """
+    return base64.urlsafe_b64encode(str(image.id).encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def after_cursor(db: Session, query, image_id: int):
+    """Rows after the image `image_id` in (created_at, id) descending order"""
+    if db.query(Image.id).filter(Image.id == image_id).first() is None:
+        # the cursor's image was deleted: ids grow with created_at, so the id alone keeps the position
+        return query.filter(Image.id < image_id)
+    created_at = db.query(Image.created_at).filter(Image.id == image_id).scalar_subquery()
+    return query.filter(or_(
+        Image.created_at < created_at,
+        and_(Image.created_at == created_at, Image.id < image_id)
+    ))
+
 @router.get("/images", response_model=ImagesSliceResponse)
-async def get_images(
+def get_images(
     images_params: ImagesParams = Depends(),  
     db: Session = Depends(get_db)
 ):
     """
-    Get a slice of images with custom pagination. Returns {length: total_count, slice: images_array}
+    Get a slice of images with custom pagination. Returns {length: total_count, slice: images_array, next_cursor}.
+    Pass `next_cursor` back as `cursor` for keyset paging; `page`/`limit` offset paging still works.
+    `size=thumb` (default) inlines small thumbnails, `size=full` inlines full-resolution images.
+    Declared sync so FastAPI runs the database reads in its threadpool, off the event loop.
     """
+    cursor = decode_cursor(images_params.cursor) if images_params.cursor else None
     try:
-        query = db.query(Image).order_by(Image.created_at.desc())
+        query = db.query(Image)
         
         if images_params.task_id:
             query = query.filter(Image.task_id == images_params.task_id)
         
-        total_count = query.count()
-        offset = (images_params.page - 1) * images_params.limit 
-        images_slice = query.offset(offset).limit(images_params.limit).all() 
+        total_count = image_count_cache.get_or_compute(images_params.task_id, query.count)
+        thumbnails = images_params.size == "thumb"
+        if isinstance(image_store, DatabaseImageStore):
+            query = query.options(undefer(Image.thumb_blob if thumbnails else Image.image_blob))
+
+        query = query.order_by(Image.created_at.desc(), Image.id.desc())
+        if cursor is not None:
+            query = after_cursor(db, query, cursor)
+        else:
+            query = query.offset((images_params.page - 1) * images_params.limit)
+
+        images_slice = query.limit(images_params.limit + 1).all()
+        has_more = len(images_slice) > images_params.limit
+        images_slice = images_slice[:images_params.limit]
         
         images_list = []
         for image in images_slice:
+            loaded = load_thumbnail_bytes(image) if thumbnails else load_image_bytes(image)
             images_list.append({
                 "id":image.id,
                 "task_id": image.task_id,
                 "prompt": image.prompt,
-                "image_url": image.image_data,
+                "image_url": to_data_url(*loaded) if loaded else None,
+                "raw_url": f"/images/{image.id}/raw",
+                "thumb_url": f"/images/{image.id}/raw?size=thumb",
                 "created_at": image.created_at.isoformat() if image.created_at else None
             })
         
         return ImagesSliceResponse(
             length=total_count,
-            slice=images_list
+            slice=images_list,
+            next_cursor=encode_cursor(images_slice[-1]) if has_more and images_slice[-1].created_at else None
         )
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error retrieving images: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error retrieving images: {str(e)}")
+
+@router.get("/images/{image_id}/raw")
+def get_image_raw(image_id: int, size: str = Query("full", regex="^(thumb|full)$"), db: Session = Depends(get_db)):
+    """Stream the stored image (or its thumbnail) bytes with their content type"""
+    image = db.query(Image).filter(Image.id == image_id).first()
+    if not image:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    thumbnail = size == "thumb" and image.thumb_key is not None
+    storage_key = image.thumb_key if thumbnail else image.storage_key
+    headers = {"Cache-Control": "public, max-age=31536000, immutable"}
+    if storage_key:
+        headers["ETag"] = f'"{storage_key}"'
+
+    path = image_store.thumbnail_path(image) if thumbnail else image_store.file_path(image)
+    if path:
+        mime_type = image.thumb_mime_type if thumbnail else image.mime_type
+        return FileResponse(path, media_type=mime_type or "image/png", headers=headers)
+
+    loaded = load_thumbnail_bytes(image) if thumbnail else load_image_bytes(image)
+    if not loaded:
+        raise HTTPException(status_code=404, detail="Image data not found")
+    data, mime_type = loaded
+    return Response(content=data, media_type=mime_type, headers=headers)
\ No newline at end of file
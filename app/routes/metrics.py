@@ -0,0 +1,45 @@
+from typing import Dict, List
+from fastapi import APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from app.core.db_writer import db_writer
+from app.core.result_cache import result_cache
+
+router = APIRouter()
+
+def _lines(prefix: str, values: Dict[str, float]) -> List[str]:
+    return [f"{prefix}{name} {value}" for name, value in values.items()]
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    """Counters and gauges in the Prometheus text format (model lifetime, queue, caches, database writer)"""
+    state = request.app.state
+    lines: List[str] = []
+
+    model = getattr(state, "model", None)
+    if model is not None:
+        lines += _lines("sd_", model.metrics())
+
+    generation_queue = getattr(state, "generation_queue", None)
+    if generation_queue is not None:
+        lines += _lines("sd_", {
+            "queue_pending": generation_queue.pending_count,
+            "queue_running": generation_queue.running_count,
+            "queue_reserved_memory_bytes": generation_queue.reserved_bytes
+        })
+
+    cache_stats = result_cache.stats()
+    lines += _lines("sd_result_cache_", {
+        "hits_total": cache_stats["hits"],
+        "misses_total": cache_stats["misses"],
+        "memory_items": cache_stats["memory_items"],
+        "disk_bytes": cache_stats["disk_bytes"]
+    })
+
+    lines += _lines("sd_db_", {
+        "writes_total": db_writer.writes,
+        "batches_total": db_writer.batches,
+        "write_failures_total": db_writer.failures,
+        "writes_dropped_total": db_writer.dropped,
+        "writes_pending": db_writer.pending_count
+    })
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from app.core.samplers import SAMPLERS
+
+router = APIRouter()
+
+@router.get("/samplers")
+async def get_samplers():
+    """Samplers accepted in GenerateRequest.sampler, with the step count each is tuned for"""
+    return {
+        "samplers": [
+            {"name": name, "recommended_steps": sampler.recommended_steps, "description": sampler.description}
+            for name, sampler in SAMPLERS.items()
+        ]
+    }
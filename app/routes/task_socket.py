@@ -0,0 +1,111 @@
+import asyncio
+from typing import Set
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from app.config import WS_BATCH_INTERVAL_MS, WS_MAX_SUBSCRIPTIONS
+from app.core.task_manager import TERMINAL_STATUSES, TaskManager
+from app.events.generate_stream import task_event_data
+
+router = APIRouter()
+
+@router.websocket("/ws/tasks")
+async def task_updates_socket(websocket: WebSocket):
+    """
+    One connection for many task subscriptions. Clients send
+    {"action": "subscribe" | "unsubscribe", "task_ids": [...]} and receive
+    {"type": "updates", "updates": [...]} batches holding the latest state of every changed task.
+    Subscriptions end on their own once a task reaches a final status.
+    """
+    await websocket.accept()
+
+    task_manager: TaskManager = websocket.app.state.task_manager
+    event_bus = task_manager.event_bus
+    subscriptions: Set[str] = set()
+    changed: Set[str] = set()
+    wake_up = asyncio.Event()
+
+    def mark_changed(task_id: str) -> None:
+        changed.add(task_id)
+        wake_up.set()
+
+    def subscribe(task_id: str) -> bool:
+        if task_id in subscriptions:
+            return True
+        if len(subscriptions) >= WS_MAX_SUBSCRIPTIONS:
+            return False
+        event_bus.subscribe(task_id, watcher=mark_changed)
+        subscriptions.add(task_id)
+        mark_changed(task_id)  # send the current state straight away
+        return True
+
+    def unsubscribe(task_id: str) -> None:
+        if task_id in subscriptions:
+            subscriptions.discard(task_id)
+            changed.discard(task_id)
+            event_bus.unsubscribe(task_id, watcher=mark_changed)
+
+    async def receive_commands():
+        while True:
+            message = await websocket.receive_json()
+            action = message.get("action") if isinstance(message, dict) else None
+            task_ids = message.get("task_ids", []) if isinstance(message, dict) else []
+
+            if action not in ("subscribe", "unsubscribe"):
+                await websocket.send_json({"type": "error", "message": f"Unknown action: {action}"})
+                continue
+            if not isinstance(task_ids, list) or not all(isinstance(task_id, str) for task_id in task_ids):
+                await websocket.send_json({"type": "error", "message": "task_ids must be a list of strings"})
+                continue
+
+            if action == "subscribe":
+                rejected = [task_id for task_id in task_ids if not subscribe(task_id)]
+                if rejected:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": f"Subscription limit of {WS_MAX_SUBSCRIPTIONS} reached",
+                        "task_ids": rejected,
+                    })
+            else:
+                for task_id in task_ids:
+                    unsubscribe(task_id)
+
+    async def send_updates():
+        while True:
+            await wake_up.wait()
+            # let changes from other tasks pile up so they go out in one frame
+            await asyncio.sleep(WS_BATCH_INTERVAL_MS / 1000)
+            wake_up.clear()
+
+            updates = []
+            for task_id in list(changed):
+                changed.discard(task_id)
+                if task_id not in subscriptions:
+                    continue
+
+                task_info = task_manager.get_task_info(task_id)
+                if not task_info:
+                    updates.append({'task_id': task_id, 'status': 'error', 'error': 'Task not found'})
+                    unsubscribe(task_id)
+                    continue
+
+                updates.append(task_event_data(task_info))
+                if task_info.status in TERMINAL_STATUSES:
+                    unsubscribe(task_id)
+
+            if updates:
+                await websocket.send_json({"type": "updates", "updates": updates})
+
+    print("🔗 Client connected to task updates socket")
+    receiver = asyncio.ensure_future(receive_commands())
+    sender = asyncio.ensure_future(send_updates())
+    try:
+        done, _ = await asyncio.wait([receiver, sender], return_when=asyncio.FIRST_COMPLETED)
+        for finished in done:
+            error = finished.exception()
+            if error and not isinstance(error, WebSocketDisconnect):
+                print(f"❌ Error in task updates socket: {error}")
+    finally:
+        receiver.cancel()
+        sender.cancel()
+        for task_id in list(subscriptions):
+            unsubscribe(task_id)
+        print("🔌 Client disconnected from task updates socket")
\ No newline at end of file
@@ -1,6 +1,7 @@
 
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import JSONResponse
+from app.core.generation_queue import GenerationQueue
 from app.core.task_manager import TaskManager, TaskStatus
 from app.models.image_models import TaskStatusResponse
 
@@ -10,16 +11,18 @@ router = APIRouter()
 async def get_generation_status(request: Request, task_id: str):
     """Check the status of a generation task"""
     task_manager: TaskManager = request.app.state.task_manager
+    generation_queue: GenerationQueue = request.app.state.generation_queue
     
     print(f"🔍 Status check for task {task_id}")
-    all_tasks = task_manager.list_all_tasks()
-    print(f"📊 Available tasks: {list(all_tasks.keys())}")
+    print(f"📊 Available tasks: {task_manager.count_by_status()}")
 
     task_info = task_manager.get_task_info(task_id)
     
     if not task_info:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    queue_position, eta_seconds = generation_queue.progress(task_id)
+
     task_data = {
         'status': task_info.status,
         'progress': task_info.progress,
@@ -40,5 +43,8 @@ async def get_generation_status(request: Request, task_id: str):
         "completed_at": task_data.get('completed_at'),
         "cancelled": task_data.get('cancelled', False),
         "result": task_data.get('result', False),
-        "prompt": task_data['prompt']
+        "prompt": task_data['prompt'],
+        "cache_hit": task_info.cache_hit,
+        "queue_position": queue_position,
+        "eta_seconds": eta_seconds
     })
\ No newline at end of file
@@ -9,25 +9,26 @@ router = APIRouter()
 async def get_tasks(request: Request):
     """List all ongoing and recent tasks"""
     task_manager: TaskManager = request.app.state.task_manager
-    all_tasks = task_manager.list_all_tasks()
+    all_tasks = list(task_manager.iter_tasks())
     
     print(f"\n📋 Total Tasks: {len(all_tasks)}")
+
+    def prompt_preview(task_info):
+        prompt = task_info.prompt or 'N/A'
+        return prompt[:50] + "..." if len(prompt) > 50 else prompt
     
-    for task_id, task_data in all_tasks.items():
-        status = task_data['status']
-        progress = task_data.get('progress', 0)
-        prompt_preview = task_data.get('prompt', 'N/A')[:50] + "..." if task_data.get('prompt') and len(task_data.get('prompt', '')) > 50 else task_data.get('prompt', 'N/A')
-        print(f"  - {task_id}: {status} ({progress}%) - '{prompt_preview}'")
+    for task_info in all_tasks:
+        print(f"  - {task_info.task_id}: {task_info.status} ({task_info.progress}%) - '{prompt_preview(task_info)}'")
     
     return JSONResponse({
         "total_tasks": len(all_tasks),
         "tasks": {
-            task_id: {
-                "status": data['status'],
-                "progress": data.get('progress', 0),
-                "created_at": data['created_at'],
-                "prompt": data.get('prompt', 'N/A')[:50] + "..." if data.get('prompt') and len(data.get('prompt', '')) > 50 else data.get('prompt', 'N/A')
+            task_info.task_id: {
+                "status": task_info.status,
+                "progress": task_info.progress or 0,
+                "created_at": task_info.created_at,
+                "prompt": prompt_preview(task_info)
             }
-            for task_id, data in all_tasks.items()
+            for task_info in all_tasks
         }
     })
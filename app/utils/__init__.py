@@ -1,5 +1,5 @@
-from .lifespan import lifespan
-from .image_processing import resize_image_base64, validate_image_dimensions
+from .image_processing import resize_image_base64, validate_image_dimensions, to_data_url, from_data_url, encode_image, EncodedImage, create_thumbnail, create_thumbnail_from_bytes
+from .count_cache import image_count_cache, CountCache
 from .database import get_db, engine, Base, get_engine, get_session, initialize_database, create_database_if_not_exists
 
-__all__ = ['create_database_if_not_exists','initialize_database','get_engine','lifespan', 'validate_image_dimensions', 'resize_image_base64', 'get_db', 'engine', 'Base', 'get_session']
\ No newline at end of file
+__all__ = ['create_database_if_not_exists','initialize_database','get_engine', 'validate_image_dimensions', 'resize_image_base64', 'to_data_url', 'from_data_url', 'encode_image', 'EncodedImage', 'create_thumbnail', 'create_thumbnail_from_bytes', 'image_count_cache', 'CountCache', 'get_db', 'engine', 'Base', 'get_session']
\ No newline at end of file
@@ -0,0 +1,42 @@
+import threading
+import time
+from typing import Callable, Dict, Hashable, Tuple
+from app.config import IMAGE_COUNT_TTL_SECONDS
+
+class CountCache:
+    """Row counts cached for a short TTL and kept current by the writers.
+
+    Writers call `adjust` after inserts and deletes so the cached total stays exact
+    between refreshes; filtered counts are simply dropped and recomputed on demand.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._values: Dict[Hashable, Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], int]) -> int:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._values.get(key)
+            if cached is not None and cached[1] > now:
+                return cached[0]
+
+        value = compute()
+        with self._lock:
+            self._values[key] = (value, now + self.ttl_seconds)
+        return value
+
+    def adjust(self, delta: int, key: Hashable = None) -> None:
+        """Apply a change to the cached `key` count and drop every other cached count."""
+        with self._lock:
+            cached = self._values.get(key)
+            self._values = {}
+            if cached is not None:
+                self._values[key] = (max(cached[0] + delta, 0), cached[1])
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._values = {}
+
+image_count_cache = CountCache(IMAGE_COUNT_TTL_SECONDS)
\ No newline at end of file
@@ -1,14 +1,21 @@
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker
 import os
 import time
 from dotenv import load_dotenv
 from sqlalchemy.ext.declarative import declarative_base
 from urllib.parse import quote_plus
-import pyodbc
+
+try:
+    import pyodbc
+except ImportError:  # only needed for SQL Server, not with a DATABASE_URL for another database
+    pyodbc = None
 
 load_dotenv()
 
+# Any SQLAlchemy URL (e.g. sqlite:///data/app.db for local runs and benchmarks) instead of the SQL Server settings
+DATABASE_URL = os.getenv('DATABASE_URL')
+
 engine = None
 SessionLocal = None
 Base = declarative_base()
@@ -17,9 +24,37 @@ def get_engine():
     """Get or create the database engine (lazy initialization)"""
     global engine
     if engine is None:
-        engine = create_engine_with_retry()
+        engine = create_engine_from_url(DATABASE_URL) if DATABASE_URL else create_engine_with_retry()
+    return engine
+
+def create_engine_from_url(url):
+    """Engine for DATABASE_URL; the models' 'dbo' schema is mapped away on databases without schemas"""
+    options = {}
+    connect_args = {}
+    if url.startswith('sqlite'):
+        options['execution_options'] = {'schema_translate_map': {'dbo': None}}
+        connect_args['check_same_thread'] = False  # sessions are used from the writer and queue threads
+        connect_args['timeout'] = 30
+        database_path = url.split(':///', 1)[-1]
+        if database_path and database_path != ':memory:' and os.path.dirname(database_path):
+            os.makedirs(os.path.dirname(database_path), exist_ok=True)
+
+    engine = create_engine(url, pool_pre_ping=True, echo=False, connect_args=connect_args, **options)
+    if url.startswith('sqlite'):
+        @event.listens_for(engine, 'connect')
+        def _sqlite_pragmas(dbapi_connection, _):
+            cursor = dbapi_connection.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA foreign_keys=ON')
+            cursor.close()
+
+    print(f"✅ Database engine for {engine.url.render_as_string(hide_password=True)}")
     return engine
 
+def _schema(engine, table):
+    """Schema of a model table as the engine sees it, after schema_translate_map"""
+    return engine.get_execution_options().get('schema_translate_map', {}).get(table.schema, table.schema)
+
 def get_session():
     """Get a database session"""
     global SessionLocal
@@ -72,6 +107,8 @@ def create_database_if_not_exists():
         return False
 
 def create_engine_with_retry(max_retries=3, retry_delay=2):
+    if pyodbc is None:
+        raise RuntimeError("pyodbc is required for SQL Server, install it or set DATABASE_URL")
     db_user = os.getenv('DB_USER', 'sa')
     db_password = os.getenv('DB_PASSWORD')
     db_server = os.getenv('DB_SERVER', 'localhost')
@@ -177,6 +214,9 @@ async def initialize_database():
         
         print("🛠️ Creating tables with SQLAlchemy...")
         Base.metadata.create_all(bind=engine)
+        if DATABASE_URL:
+            # the manual fallback below is SQL Server DDL, other databases get the tables from the models
+            Task.metadata.create_all(bind=engine)
         
         inspector = inspect(engine)
         tables = inspector.get_table_names()
@@ -192,6 +232,9 @@ async def initialize_database():
                 print(f"✅ Table '{table}' verified")
             else:
                 print(f"❌ Table '{table}' not found!")
+
+        add_missing_columns(engine)
+        add_missing_indexes(engine)
                 
         return True
                 
@@ -209,7 +252,12 @@ def create_tables_manually(engine):
                 task_id NVARCHAR(36) UNIQUE NOT NULL,
                 status NVARCHAR(20) DEFAULT 'pending',
                 progress INT DEFAULT 0,
+                prompt NVARCHAR(MAX) NULL,
+                request NVARCHAR(MAX) NULL,
+                error NVARCHAR(MAX) NULL,
                 created_at DATETIME2 DEFAULT GETDATE(),
+                started_at DATETIME2 NULL,
+                completed_at DATETIME2 NULL,
                 updated_at DATETIME2 NULL
             )
         """))
@@ -221,10 +269,50 @@ def create_tables_manually(engine):
                 id INT IDENTITY(1,1) PRIMARY KEY,
                 task_id NVARCHAR(36) UNIQUE NOT NULL,
                 image_data NVARCHAR(MAX),
+                storage_key NVARCHAR(64) NULL,
+                size_bytes INT NULL,
+                mime_type NVARCHAR(32) NULL,
+                image_blob VARBINARY(MAX) NULL,
+                thumb_key NVARCHAR(64) NULL,
+                thumb_mime_type NVARCHAR(32) NULL,
+                thumb_blob VARBINARY(MAX) NULL,
                 prompt NVARCHAR(MAX),
                 created_at DATETIME2 DEFAULT GETDATE(),
                 CONSTRAINT FK_Image_Task FOREIGN KEY (task_id) 
                 REFERENCES tasks(task_id) ON DELETE CASCADE
             )
         """))
-        print("✅ Images table created/verified")
\ No newline at end of file
+        print("✅ Images table created/verified")
+
+def add_missing_columns(engine):
+    """Add nullable columns declared on the models but missing from existing tables"""
+    from app.models.db_models import Base as ModelsBase
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in ModelsBase.metadata.sorted_tables:
+            schema = _schema(engine, table)
+            existing = {column['name'] for column in inspector.get_columns(table.name, schema=schema)}
+            if not existing:
+                continue
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                table_name = f"{schema}.{table.name}" if schema else table.name
+                conn.execute(text(f"ALTER TABLE {table_name} ADD {column.name} {column_type} NULL"))
+                print(f"✅ Added column '{table.name}.{column.name}'")
+
+
+def add_missing_indexes(engine):
+    """Create indexes declared on the models but missing from existing tables"""
+    from app.models.db_models import Base as ModelsBase
+
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in ModelsBase.metadata.sorted_tables:
+            existing = {index['name'] for index in inspector.get_indexes(table.name, schema=_schema(engine, table))}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+                    print(f"✅ Created index '{index.name}'")
@@ -1,7 +1,94 @@
 from PIL import Image
 import io
+import time
 import base64
+from dataclasses import dataclass
+from typing import Optional, Tuple
 from fastapi import HTTPException
+from app.config import DEFAULT_IMAGE_QUALITY, THUMBNAIL_FORMAT, THUMBNAIL_QUALITY, THUMBNAIL_SIZE
+
+# output_format -> (PIL format, mime type)
+OUTPUT_FORMATS = {
+    "png": ("PNG", "image/png"),
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+    encode_ms: float
+
+def encode_image(
+    image: Image.Image,
+    output_format: str = "png",
+    quality: Optional[int] = None,
+    max_width: int = 1024,
+    max_height: int = 1024
+) -> EncodedImage:
+    """
+    Resize (only when needed) and encode a PIL image in a single pass
+    """
+    start = time.perf_counter()
+
+    if image.width > max_width or image.height > max_height:
+        image = image.copy()
+        image.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+    pil_format, mime_type = OUTPUT_FORMATS[output_format]
+    save_kwargs = {}
+    if pil_format == "PNG":
+        save_kwargs["compress_level"] = 6
+    else:
+        save_kwargs["quality"] = quality or DEFAULT_IMAGE_QUALITY
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        if pil_format == "WEBP":
+            save_kwargs["method"] = 4
+
+    buffered = io.BytesIO()
+    image.save(buffered, format=pil_format, **save_kwargs)
+
+    return EncodedImage(
+        data=buffered.getvalue(),
+        mime_type=mime_type,
+        width=image.width,
+        height=image.height,
+        encode_ms=round((time.perf_counter() - start) * 1000, 2)
+    )
+
+def to_data_url(data: bytes, mime_type: str) -> str:
+    """Wrap encoded image bytes in a data URL"""
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('utf-8')}"
+
+def from_data_url(data_url: str) -> Tuple[bytes, str]:
+    """Split a data URL into its decoded bytes and mime type"""
+    header, _, payload = data_url.partition(',')
+    mime_type = header[len('data:'):].split(';', 1)[0] or 'image/png'
+    return base64.b64decode(payload), mime_type
+
+def create_thumbnail(image: Image.Image) -> EncodedImage:
+    """
+    Small gallery thumbnail of a PIL image
+    """
+    return encode_image(
+        image,
+        output_format=THUMBNAIL_FORMAT,
+        quality=THUMBNAIL_QUALITY,
+        max_width=THUMBNAIL_SIZE,
+        max_height=THUMBNAIL_SIZE
+    )
+
+def create_thumbnail_from_bytes(data: bytes) -> EncodedImage:
+    """
+    Gallery thumbnail of an already encoded image
+    """
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (THUMBNAIL_SIZE, THUMBNAIL_SIZE))  # lets JPEG decode at reduced scale
+        return create_thumbnail(image)
 
 def resize_image_base64(base64_string: str, max_width: int = 1024, max_height: int = 1024) -> str:
     """
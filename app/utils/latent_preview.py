@@ -0,0 +1,40 @@
+import torch
+from PIL import Image
+from app.config import PREVIEW_QUALITY, PREVIEW_SIZE
+from app.utils.image_processing import encode_image, to_data_url
+
+# Linear projection of the 4 Stable Diffusion VAE latent channels onto RGB.
+# Cheap approximation of a VAE decode, good enough to judge composition and colour.
+LATENT_RGB_FACTORS = [
+    #   R        G        B
+    [ 0.3512,  0.2297,  0.3227],
+    [ 0.3250,  0.4974,  0.2350],
+    [-0.2829,  0.1762,  0.2721],
+    [-0.2120, -0.2616, -0.7177],
+]
+
+_factors_cache = {}
+
+def _factors(device: torch.device) -> torch.Tensor:
+    factors = _factors_cache.get(device)
+    if factors is None:
+        factors = _factors_cache[device] = torch.tensor(LATENT_RGB_FACTORS, dtype=torch.float32, device=device)
+    return factors
+
+@torch.no_grad()
+def latents_to_preview(latents: torch.Tensor, size: int = PREVIEW_SIZE) -> Image.Image:
+    """
+    Low-resolution RGB preview of a single sample's latents, shaped (4, h, w)
+    """
+    rgb = torch.einsum("chw,cr->rhw", latents.float(), _factors(latents.device))
+    rgb = ((rgb + 1.0) / 2.0).clamp(0.0, 1.0).mul(255).to(torch.uint8)
+    image = Image.fromarray(rgb.permute(1, 2, 0).cpu().numpy())
+    scale = size / max(image.width, image.height)
+    return image.resize((round(image.width * scale), round(image.height * scale)), Image.Resampling.BILINEAR)
+
+def latents_to_preview_url(latents: torch.Tensor, size: int = PREVIEW_SIZE) -> str:
+    """
+    Preview of a single sample's latents as a small JPEG data URL
+    """
+    encoded = encode_image(latents_to_preview(latents, size), output_format="jpeg", quality=PREVIEW_QUALITY)
+    return to_data_url(encoded.data, encoded.mime_type)
\ No newline at end of file
@@ -1,24 +1,64 @@
 from fastapi import FastAPI
+import asyncio
 from contextlib import asynccontextmanager
-from app.core import model_loader, shutdown_manager
+from functools import partial
+from app.config import EXECUTOR, GENERATION_MEMORY_BUDGET_MB, MODEL_WORKER_MODE, MODEL_WORKERS
+from app.core import model_registry, shutdown_manager
+from app.core.db_writer import db_writer
+from app.core.generation_queue import GenerationQueue
+from app.core.job_estimate import job_memory_bytes, largest_job_bytes
+from app.core.model_workers import ModelWorkerPool
+from app.core.task_events import TaskEventBus
 from app.core.scheduler import TaskScheduler
 from app.core.task_manager import TaskManager
+from app.core.task_persistence import TaskPersistence
+from app.core.task_store import InMemoryTaskStore, create_task_store
 from app.events.cleanup import db_weekly_cleanup, midnight_cleanup
+from app.events.startup import restore_tasks
+from app.routes.generate import batch_key, generate_image_task
 from app.utils.database import initialize_database
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     print("🚀 Application starting up...")
     
-    app.state.task_manager = TaskManager()
+    app.state.task_events = TaskEventBus()
+    app.state.task_events.bind(asyncio.get_running_loop())
+    app.state.task_manager = TaskManager(
+        event_bus=app.state.task_events,
+        persistence=TaskPersistence(),
+        store=create_task_store()
+    )
     app.state.scheduler = TaskScheduler()    
+    admission = dict(job_memory=job_memory_bytes, memory_budget_bytes=GENERATION_MEMORY_BUDGET_MB * 1024 * 1024)
+    largest_mb = largest_job_bytes() // (1024 * 1024)
+    if 0 < GENERATION_MEMORY_BUDGET_MB < largest_mb:
+        print(
+            f"⚠️  GENERATION_MEMORY_BUDGET_MB={GENERATION_MEMORY_BUDGET_MB} is below the {largest_mb}MB of a "
+            f"largest-size request: the biggest resolutions will be rejected with 413"
+        )
+    if MODEL_WORKER_MODE == "process":
+        app.state.model_workers = ModelWorkerPool(MODEL_WORKERS)
+        app.state.model_workers.start_in_background()
+        app.state.model = app.state.model_workers
+        app.state.generation_queue = GenerationQueue(EXECUTOR, max_workers=MODEL_WORKERS, batch_key=batch_key, **admission)
+    else:
+        app.state.model_workers = None
+        model_registry.load_in_background()
+        model_registry.start_idle_watcher()
+        app.state.model = model_registry
+        app.state.generation_queue = GenerationQueue(EXECUTOR, batch_key=batch_key, **admission)
     await initialize_database()
+    db_writer.start()
+    restore_tasks(app)
+
+    app.state.generation_queue.start(partial(generate_image_task, app))
     
     app.state.scheduler.start_midnight_scheduler(app, midnight_cleanup)
     app.state.scheduler.start_weekly_scheduler(app, db_weekly_cleanup)
     
-    if hasattr(model_loader, 'cleanup'):
-        shutdown_manager.add_cleanup_handler(model_loader.cleanup)
+    if hasattr(model_registry, 'cleanup'):
+        shutdown_manager.add_cleanup_handler(model_registry.cleanup)
         print("✅ Model cleanup handler registered")
     
     yield 
@@ -28,8 +68,23 @@ async def lifespan(app: FastAPI):
     if hasattr(app.state, 'scheduler'):
         app.state.scheduler.shutdown_scheduler()
     
+    if hasattr(app.state, 'generation_queue'):
+        app.state.generation_queue.stop()
+        app.state.generation_queue.clear()
+
     if hasattr(app.state, 'task_manager'):
+        # interrupt running pipelines without recording it, so the next start requeues them
+        # and sibling workers sharing the task store keep their tasks
+        store = app.state.task_manager.store
+        app.state.task_manager.persistence = None
+        app.state.task_manager.store = InMemoryTaskStore()
         app.state.task_manager.cancel_all()
         app.state.task_manager.delete_all()
+        store.close()
+
+    if getattr(app.state, 'model_workers', None) is not None:
+        app.state.model_workers.stop()
+
+    db_writer.stop()
     
     await shutdown_manager.run_cleanup()
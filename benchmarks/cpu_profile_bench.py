@@ -0,0 +1,75 @@
+"""
+Benchmark of the CPU performance profile settings.
+
+Loads the pipeline once per configuration (fp32 baseline, channels_last, bf16
+autocast, torch.compile of the UNet, and their combination), runs a warm-up
+call, then reports seconds per denoising step of a timed call. Run it on the
+target node with nothing else loaded; the thread count defaults to what the API
+would give one job.
+
+    python -m benchmarks.cpu_profile_bench --steps 10 --size 512
+    python -m benchmarks.cpu_profile_bench --configs baseline bf16 bf16+channels_last --threads 4 8
+"""
+import argparse
+import time
+from typing import List
+import torch
+from app.config import MODEL_NAME
+from app.core.model_loader import CPU_PROFILE, CpuProfile, cpu_supports_bf16, inference_context, load_model
+
+CONFIGS = {
+    "baseline": dict(),
+    "channels_last": dict(channels_last=True),
+    "bf16": dict(bf16=True),
+    "bf16+channels_last": dict(bf16=True, channels_last=True),
+    "compile": dict(compile_unet=True),
+    "all": dict(bf16=True, channels_last=True, compile_unet=True)
+}
+
+def seconds_per_step(pipe, profile: CpuProfile, steps: int, size: int, batch: int) -> List[float]:
+    """Durations of each denoising step of one pipeline call, the first step excluded"""
+    stamps = []
+    with torch.inference_mode(), inference_context(profile):
+        pipe(
+            prompt=["a lighthouse on a cliff at sunset"] * batch,
+            num_inference_steps=steps,
+            height=size,
+            width=size,
+            callback=lambda step, timestep, latents: stamps.append(time.perf_counter()),
+            callback_steps=1
+        )
+    return [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=MODEL_NAME)
+    parser.add_argument("--configs", nargs="+", choices=list(CONFIGS), default=list(CONFIGS))
+    parser.add_argument("--threads", type=int, nargs="+", default=[CPU_PROFILE.threads or torch.get_num_threads()])
+    parser.add_argument("--steps", type=int, default=10)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"Native bf16: {cpu_supports_bf16()}, model: {args.model}, {args.size}x{args.size}, batch {args.batch}")
+    print(f"{'config':>20} {'threads':>8} {'load s':>8} {'warm-up s':>10} {'s/step':>8} {'min s/step':>11}")
+    for name in args.configs:
+        for threads in args.threads:
+            profile = CpuProfile(threads=threads, **CONFIGS[name])
+            start = time.perf_counter()
+            pipe = load_model(args.model, cpu_profile=profile)
+            load_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            seconds_per_step(pipe, profile, 2, args.size, args.batch)  # compiles when compile_unet is set
+            warmup_seconds = time.perf_counter() - start
+
+            durations = seconds_per_step(pipe, profile, args.steps, args.size, args.batch)
+            mean = sum(durations) / len(durations) if durations else float("nan")
+            print(
+                f"{name:>20} {threads:>8} {load_seconds:>8.1f} {warmup_seconds:>10.1f} "
+                f"{mean:>8.3f} {min(durations, default=float('nan')):>11.3f}"
+            )
+            del pipe
+
+if __name__ == "__main__":
+    main()
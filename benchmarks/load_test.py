@@ -0,0 +1,440 @@
+"""
+End-to-end load and latency benchmark of the HTTP API.
+
+Starts the API in a uvicorn subprocess with the stub pipeline (no model weights)
+and a SQLite database in a temporary directory, then submits operations at a
+Poisson arrival rate for a fixed duration. Each operation is drawn from a
+weighted mix:
+
+    stream   /generate, then follow /generate-stream (with --subscribers streams)
+    poll     /generate, then poll /status until the task finishes
+    cancel   /generate, follow /generate-stream, /cancel-generation after --cancel-after seconds
+    cached   /generate with a seeded prompt from a small pool (result cache hits once warm)
+    images   GET /images, one gallery page
+
+Reported: HTTP requests/s and generations completed/s; p50/p95/p99 of the
+submit call, submit-to-first-progress, submit-to-complete and cancel-to-cancelled;
+SSE fan-out cost (spread between the first and last subscriber receiving the same
+event); DB write latency (completion until the image is listed by /images) and
+the server's /metrics counters over the run. Results are written as JSON so two
+releases can be diffed.
+
+    python -m benchmarks.load_test --rate 5 --duration 30 --output results.json
+    python -m benchmarks.load_test --mix stream=4,poll=2,cancel=1,cached=2,images=1 --subscribers 4
+    python -m benchmarks.load_test --url http://localhost:8000 --rate 2   # an already running server
+
+Needs httpx, which is listed in local.txt (pip install -r local.txt).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+import httpx
+
+OPERATIONS = ("stream", "poll", "cancel", "cached", "images")
+TERMINAL = ("completed", "cancelled", "error")
+PROMPTS = [
+    "a lighthouse on a cliff at sunset",
+    "a red fox in fresh snow",
+    "an isometric city at night, neon lights",
+    "a bowl of ramen, studio lighting",
+    "a watercolor of a mountain lake"
+]
+
+class Recorder:
+    """Latency samples (seconds) per metric, outcome counts per operation kind and the HTTP request count"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Counter] = defaultdict(Counter)
+        self.requests = 0
+
+    def add(self, metric: str, seconds: float) -> None:
+        self.samples[metric].append(seconds)
+
+    def outcome(self, kind: str, result: str) -> None:
+        self.outcomes[kind][result] += 1
+
+def percentile(values: List[float], share: float) -> float:
+    """Nearest-rank percentile of `values`, `share` in 0..1"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(share * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+def summarize(values: List[float]) -> dict:
+    """Count, mean, p50/p95/p99 and max in milliseconds"""
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values) * 1000, 2),
+        "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(values, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+        "max_ms": round(max(values) * 1000, 2)
+    }
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for entry in text.split(","):
+        kind, _, weight = entry.partition("=")
+        if kind.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"Unknown operation '{kind}', expected one of {', '.join(OPERATIONS)}")
+        mix[kind.strip()] = float(weight or 1)
+    return mix
+
+def parse_metrics(text: str) -> Dict[str, float]:
+    """Prometheus text lines of /metrics as a dict"""
+    values = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            try:
+                values[name] = float(value)
+            except ValueError:
+                continue
+    return values
+
+async def sse_events(lines):
+    """Decoded `data:` payloads of an SSE line iterator"""
+    async for line in lines:
+        if line.startswith("data:"):
+            yield json.loads(line[len("data:"):])
+
+class LoadTest:
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.recorder = Recorder()
+        self.fanout: List[float] = []
+        self.sse_events = 0
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        self.recorder.requests += 1
+        return await self.client.request(method, url, **kwargs)
+
+    def generate_body(self, seeded: bool = False) -> dict:
+        args = self.args
+        body = {
+            "prompt": random.choice(PROMPTS),
+            "steps": args.steps,
+            "width": args.size,
+            "height": args.size,
+            "seed": random.randrange(args.cache_pool) if seeded else None
+        }
+        if args.model:
+            body["model"] = args.model
+        return body
+
+    async def submit(self, kind: str, seeded: bool = False) -> Optional[dict]:
+        """POST /generate, None when the request was not accepted"""
+        start = time.perf_counter()
+        response = await self.request("POST", "/generate", json=self.generate_body(seeded))
+        self.recorder.add("submit", time.perf_counter() - start)
+        if response.status_code != 200:
+            self.recorder.outcome(kind, f"http_{response.status_code}")
+            return None
+        data = response.json()
+        data["submitted_at"] = start
+        return data
+
+    async def follow_stream(self, task_id: str, receipts: List[tuple]) -> Optional[dict]:
+        """Read one SSE stream to its last event, appending (event key, receive time) per event"""
+        last = None
+        async with self.client.stream("GET", f"/generate-stream/{task_id}", timeout=None) as response:
+            self.recorder.requests += 1
+            async for event in sse_events(response.aiter_lines()):
+                receipts.append(((event.get("status"), event.get("progress")), time.perf_counter()))
+                last = event
+                if event.get("status") in TERMINAL:
+                    break
+        return last
+
+    async def watch(self, task: dict, subscribers: int) -> Optional[dict]:
+        """Follow a task with `subscribers` concurrent streams, recording progress, completion and fan-out"""
+        streams = [[] for _ in range(subscribers)]
+        results = await asyncio.gather(*(self.follow_stream(task["task_id"], receipts) for receipts in streams))
+        self.sse_events += sum(len(receipts) for receipts in streams)
+
+        receipts = streams[0]
+        submitted = task["submitted_at"]
+        first_progress = next((at for (status, progress), at in receipts if status == "processing" or (progress or 0) > 0), None)
+        if first_progress is not None:
+            self.recorder.add("first_progress", first_progress - submitted)
+
+        if subscribers > 1:
+            # events every subscriber received: how much later the slowest one got it than the fastest
+            arrivals = defaultdict(list)
+            for stream in streams:
+                first_seen = {}
+                for key, at in stream:
+                    first_seen.setdefault(key, at)
+                for key, at in first_seen.items():
+                    arrivals[key].append(at)
+            self.fanout += [max(times) - min(times) for times in arrivals.values() if len(times) == subscribers]
+
+        last = results[0]
+        if last and last.get("status") == "completed":
+            self.recorder.add("complete", receipts[-1][1] - submitted)
+        return last
+
+    async def poll_status(self, task: dict) -> Optional[dict]:
+        first_progress = None
+        while True:
+            response = await self.request("GET", f"/status/{task['task_id']}")
+            if response.status_code != 200:
+                return None
+            status = response.json()
+            now = time.perf_counter()
+            if first_progress is None and (status["status"] != "pending" or (status.get("progress") or 0) > 0):
+                first_progress = now
+                self.recorder.add("first_progress", now - task["submitted_at"])
+            if status["status"] in TERMINAL:
+                if status["status"] == "completed":
+                    self.recorder.add("complete", now - task["submitted_at"])
+                return status
+            await asyncio.sleep(self.args.poll_interval)
+
+    async def wait_for_db(self, task_id: str) -> None:
+        """Time from completion until /images lists the task's image, i.e. the write-behind commit"""
+        start = time.perf_counter()
+        deadline = start + self.args.timeout
+        while time.perf_counter() < deadline:
+            response = await self.request("GET", "/images", params={"task_id": task_id, "limit": 1})
+            if response.status_code == 200 and response.json()["length"] > 0:
+                self.recorder.add("db_visible", time.perf_counter() - start)
+                return
+            await asyncio.sleep(self.args.db_poll_interval)
+        self.recorder.outcome("db", "not_visible")
+
+    def finish(self, kind: str, result: Optional[dict]) -> Optional[str]:
+        status = result.get("status", "error") if result else "lost"
+        self.recorder.outcome(kind, status)
+        return status
+
+    async def op_stream(self) -> None:
+        task = await self.submit("stream")
+        if task is None:
+            return
+        if task["status"] == "completed":
+            self.recorder.add("complete", time.perf_counter() - task["submitted_at"])
+            self.finish("stream", task)
+            return
+        if self.finish("stream", await self.watch(task, self.args.subscribers)) == "completed":
+            if random.random() < self.args.db_sample:
+                await self.wait_for_db(task["task_id"])
+
+    async def op_poll(self) -> None:
+        task = await self.submit("poll")
+        if task is None:
+            return
+        if task["status"] == "completed":
+            self.finish("poll", task)
+            return
+        if self.finish("poll", await self.poll_status(task)) == "completed":
+            if random.random() < self.args.db_sample:
+                await self.wait_for_db(task["task_id"])
+
+    async def op_cancel(self) -> None:
+        task = await self.submit("cancel")
+        if task is None:
+            return
+        if task["status"] == "completed":
+            self.finish("cancel", task)
+            return
+        receipts: List[tuple] = []
+        stream = asyncio.ensure_future(self.follow_stream(task["task_id"], receipts))
+        await asyncio.sleep(self.args.cancel_after)
+        cancel_start = time.perf_counter()
+        response = await self.request("POST", "/cancel-generation", json={"task_id": task["task_id"]})
+        last = await stream
+        self.sse_events += len(receipts)
+        if response.status_code == 200 and last and last.get("status") == "cancelled":
+            self.recorder.add("cancel", receipts[-1][1] - cancel_start)
+        self.finish("cancel", last)
+
+    async def op_cached(self) -> None:
+        task = await self.submit("cached", seeded=True)
+        if task is None:
+            return
+        if task["status"] == "completed":
+            self.recorder.add("cache_hit", time.perf_counter() - task["submitted_at"])
+            self.recorder.outcome("cached", "cache_hit")
+            return
+        self.finish("cached", await self.poll_status(task))
+
+    async def op_images(self) -> None:
+        start = time.perf_counter()
+        response = await self.request("GET", "/images", params={"limit": 12})
+        self.recorder.add("images", time.perf_counter() - start)
+        self.recorder.outcome("images", "ok" if response.status_code == 200 else f"http_{response.status_code}")
+
+    async def run_one(self, kind: str) -> None:
+        try:
+            await asyncio.wait_for(getattr(self, f"op_{kind}")(), self.args.timeout)
+        except asyncio.TimeoutError:
+            self.recorder.outcome(kind, "timeout")
+        except httpx.HTTPError as e:
+            self.recorder.outcome(kind, type(e).__name__)
+
+    async def run(self) -> float:
+        """Open-loop arrivals for `duration` seconds, then wait for the operations in flight; returns wall time"""
+        kinds, weights = zip(*self.args.mix.items())
+        operations = []
+        start = time.perf_counter()
+        deadline = start + self.args.duration
+        while time.perf_counter() < deadline:
+            operations.append(asyncio.ensure_future(self.run_one(random.choices(kinds, weights)[0])))
+            await asyncio.sleep(random.expovariate(self.args.rate))
+        await asyncio.gather(*operations)
+        return time.perf_counter() - start
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_server(args: argparse.Namespace, workdir: str) -> subprocess.Popen:
+    """uvicorn subprocess on the stub pipeline and a SQLite database inside `workdir`"""
+    env = dict(
+        os.environ,
+        PIPELINE_BACKEND="stub",
+        STUB_STEP_MS=str(args.step_ms),
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        IMAGE_STORE_DIR=os.path.join(workdir, "images"),
+        RESULT_CACHE_DIR=os.path.join(workdir, "results"),
+        TASK_STORE_PATH=os.path.join(workdir, "task_state.db")
+    )
+    env.update(entry.split("=", 1) for entry in args.env)
+    log = open(os.path.join(workdir, "server.log"), "w")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+
+async def wait_ready(client: httpx.AsyncClient, server: Optional[subprocess.Popen], timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Server exited with code {server.returncode}")
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server not ready after {timeout}s")
+
+async def benchmark(args: argparse.Namespace, base_url: str, server: Optional[subprocess.Popen]) -> dict:
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=200)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        await wait_ready(client, server, args.startup_timeout)
+        metrics_before = parse_metrics((await client.get("/metrics")).text)
+        load_test = LoadTest(client, args)
+        wall = await load_test.run()
+        metrics_after = parse_metrics((await client.get("/metrics")).text)
+
+    recorder = load_test.recorder
+    generations = sum(counts["completed"] + counts["cache_hit"] for counts in recorder.outcomes.values())
+    return {
+        "started_at": datetime.now().isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "keep")},
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "wall_seconds": round(wall, 3),
+        "throughput": {
+            "requests_per_s": round(recorder.requests / wall, 2),
+            "generations_per_s": round(generations / wall, 2),
+            "sse_events_per_s": round(load_test.sse_events / wall, 2)
+        },
+        "latency": {metric: summarize(values) for metric, values in sorted(recorder.samples.items())},
+        "sse_fanout": dict(summarize(load_test.fanout), subscribers=args.subscribers),
+        "outcomes": {kind: dict(counts) for kind, counts in sorted(recorder.outcomes.items())},
+        "server_metrics": {
+            name: metrics_after[name] - metrics_before.get(name, 0) if name.endswith("_total") else metrics_after[name]
+            for name in sorted(metrics_after) if name.startswith(("sd_db_", "sd_result_cache_", "sd_queue_", "sd_prompt_cache_"))
+        }
+    }
+
+def print_report(results: dict) -> None:
+    throughput = results["throughput"]
+    print(f"\n{results['wall_seconds']}s: {throughput['requests_per_s']} requests/s, "
+          f"{throughput['generations_per_s']} generations/s, {throughput['sse_events_per_s']} SSE events/s")
+    print(f"{'latency':>16} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = dict(results["latency"], sse_fanout=results["sse_fanout"])
+    for metric, stats in rows.items():
+        if stats["count"]:
+            print(f"{metric:>16} {stats['count']:>7} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} {stats['max_ms']:>9}")
+    for kind, counts in results["outcomes"].items():
+        print(f"{kind:>16}: {', '.join(f'{outcome} {count}' for outcome, count in sorted(counts.items()))}")
+    db = [f"{name[len('sd_db_'):]} {value:g}" for name, value in results["server_metrics"].items() if name.startswith("sd_db_")]
+    print(f"{'database':>16}: {', '.join(db)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=2.0, help="operations started per second (Poisson arrivals)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of arrivals")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("stream=4,poll=2,cancel=1,cached=2,images=1"))
+    parser.add_argument("--subscribers", type=int, default=2, help="concurrent SSE streams per stream operation")
+    parser.add_argument("--steps", type=int, default=20)
+    parser.add_argument("--size", type=int, default=512)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--step-ms", type=float, default=20.0, help="STUB_STEP_MS of the spawned server")
+    parser.add_argument("--cache-pool", type=int, default=5, help="distinct seeds used by cached operations")
+    parser.add_argument("--cancel-after", type=float, default=0.2)
+    parser.add_argument("--poll-interval", type=float, default=0.1)
+    parser.add_argument("--db-sample", type=float, default=1.0, help="share of completed tasks timed until /images lists them")
+    parser.add_argument("--db-poll-interval", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=120.0, help="per operation")
+    parser.add_argument("--startup-timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0, help="random seed of arrivals and the task mix")
+    parser.add_argument("--url", default=None, help="benchmark this server instead of spawning one")
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--env", nargs="*", default=[], metavar="KEY=VALUE", help="extra settings of the spawned server")
+    parser.add_argument("--output", default=None, help="JSON results file, - for stdout")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary directory (server log, database)")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    server = None
+    workdir = None
+    base_url = args.url
+    if base_url is None:
+        args.port = args.port or free_port()
+        workdir = tempfile.mkdtemp(prefix="sd-load-test-")
+        server = start_server(args, workdir)
+        base_url = f"http://127.0.0.1:{args.port}"
+        print(f"Server on {base_url}, stub pipeline at {args.step_ms}ms/step, working directory {workdir}")
+
+    try:
+        results = asyncio.run(benchmark(args, base_url, server))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(15)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        if workdir and not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(results)
+    if args.output == "-":
+        print(json.dumps(results, indent=2))
+    elif args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Micro-benchmark for TaskManager status queries.
+
+Fills a TaskManager with N tasks in a realistic status mix (mostly finished
+tasks carrying a large result) and times the lookups the API performs on every
+request. Per-call times should stay flat as N grows.
+
+    python -m benchmarks.task_manager_bench --sizes 1000 10000 50000
+"""
+import argparse
+import random
+import time
+from app.core.task_manager import TaskManager, TaskStatus
+
+FAKE_RESULT = {"task_id": "", "image_url": "data:image/png;base64," + "A" * 200_000, "prompt": "benchmark"}
+
+def build_manager(size: int) -> TaskManager:
+    task_manager = TaskManager()
+    for index in range(size):
+        task_id = task_manager.create_task(request={"prompt": f"prompt {index}"}, prompt=f"prompt {index}")
+        roll = random.random()
+        if roll < 0.9:
+            task_manager.mark_task_completed(task_id, dict(FAKE_RESULT, task_id=task_id))
+        elif roll < 0.95:
+            task_manager.mark_task_cancelled(task_id)
+        elif roll < 0.97:
+            task_manager.update_task_status(task_id, TaskStatus.PROCESSING)
+    return task_manager
+
+def time_per_call(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 50_000])
+    parser.add_argument("--repeat", type=int, default=2_000)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8} {'get_task_info':>15} {'count':>10} {'count_by_status':>17} {'cancel pending':>16}   (µs per call)")
+    for size in args.sizes:
+        task_manager = build_manager(size)
+        task_ids = list(task_manager.task_metadata)
+
+        lookup = time_per_call(lambda: task_manager.get_task_info(random.choice(task_ids)), args.repeat)
+        count = time_per_call(lambda: task_manager.count, args.repeat)
+        by_status = time_per_call(task_manager.count_by_status, args.repeat)
+
+        def create_and_cancel():
+            task_id = task_manager.create_task(request={}, prompt="x")
+            task_manager.cancel_task(task_id)
+        cancel = time_per_call(create_and_cancel, min(args.repeat, 200))
+
+        print(f"{size:>8} {lookup:>15.2f} {count:>10.2f} {by_status:>17.2f} {cancel:>16.2f}")
+
+if __name__ == "__main__":
+    main()